@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def synchronous_thumbnails(settings):
+    # Воркеры миниатюр пишут в MEDIA_ROOT уже после ответа, а фикстуры
+    # удаляют временную папку сразу после теста
+    settings.THUMBNAIL_WORKERS = 0
@@ -0,0 +1,29 @@
+# Компактное представление постов для API: автор и группа отдаются
+# ссылками (username и slug), а не вложенными объектами.
+
+
+def post_data(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }
+
+
+def post_detail_data(post, comments):
+    data = post_data(post)
+    data['comment_count'] = post.comment_count
+    data['comments'] = [comment_data(comment) for comment in comments]
+    return data
@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+from ..views import PAGE_SIZE
+
+USERNAME = 'reader'
+AUTHOR = 'author'
+SLUG = 'api_group'
+TEXT = 'Текст поста'
+
+
+class ApiViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username=USERNAME)
+        self.author = User.objects.create_user(username=AUTHOR)
+        self.group = Group.objects.create(
+            title='Группа', slug=SLUG, description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, group=self.group, text=TEXT
+            )
+            for _ in range(PAGE_SIZE + 1)
+        ]
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты отдают посты страницами со ссылкой на следующую."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group', args=(SLUG,)),
+            reverse('api:profile', args=(AUTHOR,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(len(data['results']), PAGE_SIZE)
+                self.assertEqual(data['results'][0], {
+                    'id': self.posts[-1].pk,
+                    'text': TEXT,
+                    'pub_date': data['results'][0]['pub_date'],
+                    'author': AUTHOR,
+                    'group': SLUG,
+                    'image': None,
+                })
+                data = self.guest_client.get(data['next']).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    [self.posts[0].pk]
+                )
+                self.assertIsNone(data['next'])
+
+    def test_repeat_poll_is_not_modified(self):
+        """Повторный запрос с ETag получает 304 без обращений к базе."""
+        url = reverse('api:index')
+        response = self.guest_client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text=TEXT)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_edit_changes_feed_etag(self):
+        """Правка поста меняет ETag лент, где он показан."""
+        url = reverse('api:group', args=(SLUG,))
+        etag = self.guest_client.get(url)['ETag']
+        post = self.posts[-1]
+        post.text = 'Новый текст'
+        post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый текст')
+
+    def test_follow_feed(self):
+        """Лента подписок только для вошедших и меняется при подписке."""
+        url = reverse('api:follow')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.json()['results'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(len(response.json()['results']), PAGE_SIZE)
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с комментариями, новый комментарий меняет ETag."""
+        post = self.posts[0]
+        url = reverse('api:post_detail', args=(post.pk,))
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(post=post, author=self.reader, text=TEXT)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        data = response.json()
+        self.assertEqual(data['comment_count'], 1)
+        self.assertEqual(data['comments'][0]['author'], USERNAME)
+        self.assertIsNone(data['comments_next'])
+        response = self.guest_client.get(
+            reverse('api:post_comments', args=(post.pk,))
+        )
+        self.assertEqual(response.json()['results'], data['comments'])
+
+    def test_missing_objects(self):
+        """Несуществующие объекты дают 404 в JSON."""
+        urls = (
+            reverse('api:group', args=('missing',)),
+            reverse('api:profile', args=('missing',)),
+            reverse('api:post_detail', args=(0,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
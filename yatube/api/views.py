@@ -0,0 +1,155 @@
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from core.paginators import CursorPaginator
+from posts import fragments
+from posts.conditional import post_names, versioned
+from posts.models import Group, Post, TimelineEntry, User
+from posts.comments import comments_page
+
+from .serializers import comment_data, post_data, post_detail_data
+
+PAGE_SIZE = 20
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def _response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def _error(status, detail):
+    return _response({'detail': detail}, status=status)
+
+
+def _feed(request, queryset, feed, ordering=('-pub_date', '-id'),
+          get_post=None, depends=()):
+    """Отдаёт страницу ленты по курсору из параметра cursor."""
+    paginator = CursorPaginator(queryset, PAGE_SIZE, ordering=ordering)
+    page = fragments.cursor_page(
+        paginator, request.GET.get('cursor'), feed, depends
+    )
+    links = {}
+    for name, cursor in (('next', page.next_cursor),
+                         ('previous', page.previous_cursor)):
+        links[name] = f'{request.path}?cursor={cursor}' if cursor else None
+    return _response({
+        'results': [
+            post_data(get_post(obj) if get_post else obj) for obj in page
+        ],
+        **links,
+    })
+
+
+def _group_pk(slug):
+    return Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+
+
+def _author_pk(username):
+    return User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+
+
+def _posts():
+    return Post.objects.select_related('author', 'group')
+
+
+@require_GET
+@versioned(lambda request: ['feed:index'])
+def index(request):
+    return _feed(request, _posts(), 'feed:index')
+
+
+def _group_names(request, slug):
+    group_pk = _group_pk(slug)
+    return None if group_pk is None else [f'feed:group:{group_pk}']
+
+
+@require_GET
+@versioned(_group_names)
+def group_posts(request, slug):
+    group_pk = _group_pk(slug)
+    if group_pk is None:
+        return _error(404, 'Группа не найдена')
+    return _feed(
+        request, _posts().filter(group_id=group_pk), f'feed:group:{group_pk}'
+    )
+
+
+def _profile_names(request, username):
+    author_pk = _author_pk(username)
+    return None if author_pk is None else [f'feed:profile:{author_pk}']
+
+
+@require_GET
+@versioned(_profile_names)
+def profile(request, username):
+    author_pk = _author_pk(username)
+    if author_pk is None:
+        return _error(404, 'Пользователь не найден')
+    return _feed(
+        request,
+        _posts().filter(author_id=author_pk),
+        f'feed:profile:{author_pk}'
+    )
+
+
+def _followed_feeds(request):
+    # Список подписок нужен и для ETag, и для ключа страницы в кэше
+    if not hasattr(request, '_followed_feeds'):
+        request._followed_feeds = fragments.followed_feeds(request.user.pk)
+    return request._followed_feeds
+
+
+def _follow_names(request):
+    if not request.user.is_authenticated:
+        return None
+    return [f'feed:follow:{request.user.pk}', *_followed_feeds(request)]
+
+
+@require_GET
+@versioned(_follow_names)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error(401, 'Нужно войти на сайт')
+    entries = TimelineEntry.objects.filter(
+        user=request.user
+    ).select_related('post__author', 'post__group')
+    return _feed(
+        request,
+        entries,
+        f'feed:follow:{request.user.pk}',
+        ordering=('-pub_date', '-post_id'),
+        get_post=lambda entry: entry.post,
+        depends=_followed_feeds(request),
+    )
+
+
+@require_GET
+@versioned(post_names)
+def post_detail(request, post_id):
+    post = _posts().filter(pk=post_id).first()
+    if post is None:
+        return _error(404, 'Пост не найден')
+    comments = comments_page(request, post_id)
+    data = post_detail_data(post, comments)
+    data['comments_next'] = _comments_link(post_id, comments.next_cursor)
+    return _response(data)
+
+
+def _comments_link(post_id, cursor):
+    if not cursor:
+        return None
+    path = reverse('api:post_comments', args=(post_id,))
+    return f'{path}?comments={cursor}'
+
+
+@require_GET
+@versioned(lambda request, post_id: [f'comments:{post_id}'])
+def post_comments(request, post_id):
+    comments = comments_page(request, post_id)
+    return _response({
+        'results': [comment_data(comment) for comment in comments],
+        'next': _comments_link(post_id, comments.next_cursor),
+    })
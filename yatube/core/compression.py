@@ -0,0 +1,114 @@
+# Сжатие ответов gzip и brotli. Лента из одинаковых карточек постов
+# сжимается в разы, а картинки, архивы и совсем короткие ответы
+# не сжимаются: выигрыша почти нет, а процессор тратится.
+import zlib
+
+from django.utils.http import quote_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Короче этого ответ помещается в пару пакетов и без сжатия
+MIN_SIZE = 1024
+# Уровни для ответов на лету: дальше сжатие растёт медленнее, чем время.
+# Прогон benchmark --routes compression показывает цену уровней
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = (
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+    'image/x-icon',
+)
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, quality = item.partition(';')
+        quality = quality.strip().replace(' ', '')
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def available_encodings():
+    """Кодировки, которыми умеет сжимать сервер, лучшая первой."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(request):
+    """br, если его умеют обе стороны, иначе gzip или None."""
+    accepted = accepted_encodings(request)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compressible(response):
+    """Стоит ли сжимать ответ: текстовый, ещё не сжатый и не короткий."""
+    if response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    if not (content_type.startswith('text/')
+            or content_type in COMPRESSIBLE_TYPES
+            or content_type.endswith(('+json', '+xml'))):
+        return False
+    if response.streaming:
+        # Длину потока знаем, только если её заранее выставил view
+        length = response.get('Content-Length')
+        return length is None or int(length) >= MIN_SIZE
+    return len(response.content) >= MIN_SIZE
+
+
+def weak_etag(etag):
+    """ETag сжатого ответа: тело уже не совпадает байт в байт с исходным."""
+    return etag if etag.startswith('W/') else f'W/{quote_etag(etag)}'
+
+
+def _gzip_compressor(level):
+    # wbits 31 — поток в обёртке gzip, время в заголовке нулевое
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def compress(content, encoding, level=None):
+    """Сжимает байты целиком."""
+    if encoding == 'br':
+        return brotli.compress(
+            content, quality=BROTLI_QUALITY if level is None else level
+        )
+    compressor = _gzip_compressor(GZIP_LEVEL if level is None else level)
+    return compressor.compress(content) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток по частям.
+
+    Каждая часть сбрасывается сразу, чтобы клиент получал начало
+    страницы, не дожидаясь конца потока.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = _gzip_compressor(GZIP_LEVEL)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
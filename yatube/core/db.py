@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_sqlite_pragmas(connection, pragmas=None):
+    """Выполняет PRAGMA из SQLITE_PRAGMAS на открытом соединении sqlite3."""
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name}={value}')
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    # WAL пускает читателей параллельно с писателем, а синхронизация
+    # NORMAL в этом режиме не теряет целостность базы при сбое
+    if connection.vendor == 'sqlite':
+        apply_sqlite_pragmas(connection.connection)
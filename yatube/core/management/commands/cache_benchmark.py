@@ -0,0 +1,54 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает задержку попадания в кэш у LocMemCache и SQLiteCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10000)
+        parser.add_argument(
+            '--size', type=int, default=4096,
+            help='Размер значения в байтах, по умолчанию как у карточки поста'
+        )
+
+    def measure(self, cache, iterations, value):
+        cache.set('bench', value, None)
+        cache.set('bench_version', 1, None)
+        hits, incrs = [], []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            cache.get('bench')
+            hits.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            cache.incr('bench_version')
+            incrs.append(time.perf_counter() - started)
+        return hits, incrs
+
+    def report(self, name, samples):
+        samples = sorted(samples)
+        p50 = statistics.median(samples) * 1e6
+        p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+        self.stdout.write(f'{name:<24} p50 {p50:8.1f} мкс  p99 {p99:8.1f} мкс')
+
+    def handle(self, *args, **options):
+        value = 'x' * options['size']
+        iterations = options['iterations']
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                'locmem': LocMemCache('cache_benchmark', {}),
+                'sqlite': SQLiteCache(
+                    os.path.join(directory, 'cache.sqlite3'), {}
+                ),
+            }
+            for name, cache in backends.items():
+                hits, incrs = self.measure(cache, iterations, value)
+                self.report(f'{name} get', hits)
+                self.report(f'{name} incr', incrs)
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_sqlite_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'pub_date REAL, text TEXT)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC, id DESC)',
+)
+FEED_QUERY = (
+    'SELECT id, author_id, text FROM post '
+    'ORDER BY pub_date DESC, id DESC LIMIT 10'
+)
+INSERT = 'INSERT INTO post (author_id, pub_date, text) VALUES (?, ?, ?)'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность sqlite без настроек '
+        '(журнал DELETE, соединение на каждый запрос) и с SQLITE_PRAGMAS '
+        'и постоянными соединениями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--posts', type=int, default=10000)
+
+    def prepare(self, path, pragmas, posts):
+        connection = sqlite3.connect(path, isolation_level=None)
+        apply_sqlite_pragmas(connection, pragmas)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.execute('BEGIN')
+        connection.executemany(INSERT, (
+            (number % 100, time.time(), 'x' * 200) for number in range(posts)
+        ))
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run_profile(self, path, pragmas, persistent, options):
+        counts = {'read': 0, 'write': 0, 'busy': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def connect():
+            # busy_timeout ставится и без настроек, иначе писатели
+            # сразу падают с «database is locked»
+            connection = sqlite3.connect(
+                path, timeout=5, isolation_level=None
+            )
+            apply_sqlite_pragmas(connection, pragmas)
+            return connection
+
+        def worker(kind):
+            done = busy = 0
+            connection = connect() if persistent else None
+            while time.monotonic() < deadline:
+                current = connection or connect()
+                try:
+                    if kind == 'read':
+                        current.execute(FEED_QUERY).fetchall()
+                    else:
+                        current.execute(INSERT, (1, time.time(), 'y' * 200))
+                    done += 1
+                except sqlite3.OperationalError:
+                    busy += 1
+                finally:
+                    if connection is None:
+                        current.close()
+            with lock:
+                counts[kind] += done
+                counts['busy'] += busy
+
+        threads = [
+            threading.Thread(target=worker, args=('read',))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=('write',))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': ({}, False),
+            'tuned': (settings.SQLITE_PRAGMAS, True),
+        }
+        seconds = options['seconds']
+        with tempfile.TemporaryDirectory() as directory:
+            for name, (pragmas, persistent) in profiles.items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self.prepare(path, pragmas, options['posts'])
+                counts = self.run_profile(path, pragmas, persistent, options)
+                self.stdout.write(
+                    f'{name:<8} чтений/с {counts["read"] / seconds:9.0f}  '
+                    f'записей/с {counts["write"] / seconds:8.0f}  '
+                    f'ошибок блокировки {counts["busy"]}'
+                )
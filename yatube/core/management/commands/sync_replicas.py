@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def copy_database(source, target):
+    """Копирует файл sqlite целиком через backup API, не блокируя писателей."""
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу sqlite в файлы реплик из DATABASE_REPLICAS, '
+        'чтобы проверить чтение с реплик локально'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование раз в столько секунд'
+        )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда копирует только базы sqlite')
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                copy_database(
+                    primary['NAME'], settings.DATABASES[alias]['NAME']
+                )
+            self.stdout.write(self.style.SUCCESS('Реплики обновлены'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
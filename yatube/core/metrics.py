@@ -0,0 +1,170 @@
+# Замеры запросов: число и время SQL, время рендеринга шаблонов и полное
+# время ответа. Замер текущего запроса живёт в потоке, сводные гистограммы
+# по именам адресов копятся в памяти процесса, каждый воркер отдаёт свои.
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+_state = threading.local()
+_lock = threading.Lock()
+
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+HISTOGRAMS = (
+    ('queries', 'yatube_view_queries', 'SQL-запросов за ответ',
+     QUERY_BUCKETS),
+    ('sql', 'yatube_view_sql_seconds', 'Время SQL за ответ',
+     SECONDS_BUCKETS),
+    ('template', 'yatube_view_template_seconds',
+     'Время рендеринга шаблонов за ответ', SECONDS_BUCKETS),
+    ('total', 'yatube_view_duration_seconds', 'Полное время ответа',
+     SECONDS_BUCKETS),
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _new_view():
+    return {
+        name: Histogram(buckets) for name, _, _, buckets in HISTOGRAMS
+    }
+
+
+_views = defaultdict(_new_view)
+# Функции других приложений, которые дописывают свои строки в /metrics
+_collectors = []
+
+
+class RequestTimings:
+    """Замер одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.total = None
+        self.rendering = False
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing в миллисекундах."""
+        return ', '.join((
+            f'sql;desc="{self.queries} queries";dur={self.sql * 1000:.1f}',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ))
+
+
+def start():
+    _state.timings = RequestTimings()
+    return _state.timings
+
+
+def stop():
+    _state.timings = None
+
+
+def current():
+    return getattr(_state, 'timings', None)
+
+
+def record_sql(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper, считающая SQL-запросы."""
+    timings = current()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.sql += time.perf_counter() - started
+
+
+@contextmanager
+def template_timer():
+    """Засекает рендеринг шаблона.
+
+    Шаблон, отрисованный внутри другого шаблона, отдельно не считается.
+    """
+    timings = current()
+    if timings is None or timings.rendering:
+        yield
+        return
+    timings.rendering = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.template += time.perf_counter() - started
+        timings.rendering = False
+
+
+def observe(view_name, timings):
+    """Добавляет замер запроса в гистограммы его адреса."""
+    with _lock:
+        histograms = _views[view_name]
+        for name in histograms:
+            histograms[name].observe(getattr(timings, name))
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+def register(collector):
+    """Добавляет в /metrics строки, которые отдаёт collector()."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def _labels(view_name, **extra):
+    labels = {'view': view_name, **extra}
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def exposition():
+    """Гистограммы всех адресов в текстовом формате Prometheus."""
+    lines = []
+    with _lock:
+        views = sorted(_views.items())
+        for name, metric, help_text, buckets in HISTOGRAMS:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for view_name, histograms in views:
+                histogram = histograms[name]
+                for bound, count in zip(buckets, histogram.counts):
+                    labels = _labels(view_name, le=bound)
+                    lines.append(f'{metric}_bucket{{{labels}}} {count}')
+                labels = _labels(view_name, le='+Inf')
+                lines.append(
+                    f'{metric}_bucket{{{labels}}} {histogram.count}'
+                )
+                labels = _labels(view_name)
+                lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+                lines.append(
+                    f'{metric}_count{{{labels}}} {histogram.count}'
+                )
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,131 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression, metrics, routers, staticfiles
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'primary'
+
+
+class ReplicaMiddleware:
+    """Пускает безопасные запросы читать с реплик.
+
+    После успешной записи пользователь получает куку и ещё
+    REPLICA_LAG_SECONDS читает с основной базы, чтобы увидеть
+    свой новый пост или комментарий, пока реплика догоняет.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.allow_replicas(
+            request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.allow_replicas(False)
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and settings.DATABASE_REPLICAS):
+            response.set_cookie(
+                STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_LAG_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """Замеряет SQL, рендеринг шаблонов и полное время каждого ответа.
+
+    Замер уходит клиенту в заголовке Server-Timing и попадает
+    в гистограммы адреса, которые отдаёт /metrics. Стоит первым,
+    чтобы в полное время вошли и остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_sql)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        timings.finish()
+        response['Server-Timing'] = timings.server_timing()
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            metrics.observe(match.view_name, timings)
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную collectstatic статику раньше остальных middleware.
+
+    Запрос к статике не трогает сессии, базу и адреса. Файла, которого
+    нет в STATIC_ROOT, middleware не касается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(settings.STATIC_URL)):
+            response = staticfiles.serve(
+                request, request.path_info[len(settings.STATIC_URL):]
+            )
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+
+class CompressionMiddleware:
+    """Сжимает ответы gzip или brotli по Accept-Encoding клиента.
+
+    Стоит сразу за MetricsMiddleware, поэтому сжатие обычного ответа
+    входит в его полное время. Потоковые ответы сжимаются по частям уже
+    при отдаче, после замера, и в Server-Timing не попадают. Ответы,
+    уже сжатые раньше, например страницы из кэша, не трогаются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compression.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.choose_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            compressed = compression.compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        if response.has_header('ETag'):
+            response['ETag'] = compression.weak_etag(response['ETag'])
+        response['Content-Encoding'] = encoding
+        return response
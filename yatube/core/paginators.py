@@ -0,0 +1,121 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (keyset) без COUNT(*) и OFFSET.
+
+    Страница выбирается по непрозрачному курсору, в котором закодированы
+    значения полей ключа у крайней записи соседней страницы, поэтому
+    любая страница отдаётся одним запросом с LIMIT по индексу.
+    Нумерованные страницы унаследованы от ``Paginator`` и доступны
+    через ``get_page``.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), **kwargs):
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.key_fields = tuple(field.lstrip('-') for field in self.ordering)
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs
+        )
+
+    def _encode(self, values, reverse):
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ]
+        payload = json.dumps({'k': values, 'r': reverse})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def encode_cursor(self, obj, reverse=False):
+        return self._encode(
+            [getattr(obj, field) for field in self.key_fields], reverse
+        )
+
+    def normalize_cursor(self, cursor):
+        """Курсор в каноническом виде, '' для первой страницы.
+
+        Разные записи одного положения, например с лишними полями
+        или другим порядком ключей в JSON, дают одну строку.
+        """
+        decoded = self.decode_cursor(cursor)
+        if decoded is None:
+            return ''
+        return self._encode(*decoded)
+
+    def decode_cursor(self, cursor):
+        """Возвращает (значения ключа, reverse) или None."""
+        if not cursor:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = payload['k']
+            reverse = bool(payload['r'])
+            if len(values) != len(self.key_fields):
+                return None
+            model = self.object_list.model
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.key_fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, KeyError,
+                AttributeError, FieldDoesNotExist, ValidationError):
+            return None
+        return values, reverse
+
+    def _keyset_filter(self, values, forward):
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.key_fields):
+            equal = dict(zip(self.key_fields[:index], values[:index]))
+            equal[f'{field}__{lookup}'] = values[index]
+            condition |= Q(**equal)
+        return condition
+
+    def get_cursor_page(self, cursor=None):
+        """Отдаёт страницу после (или до) записи, указанной курсором.
+
+        Пустой или испорченный курсор означает первую страницу.
+        """
+        decoded = self.decode_cursor(cursor)
+        queryset = self.object_list
+        reverse = False
+        if decoded is not None:
+            values, reverse = decoded
+            queryset = queryset.filter(
+                self._keyset_filter(values, forward=not reverse)
+            )
+            if reverse:
+                queryset = queryset.reverse()
+            cursor = self._encode(values, reverse)
+        else:
+            cursor = ''
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if reverse:
+            objects.reverse()
+        next_cursor = previous_cursor = None
+        if objects:
+            if has_more or reverse:
+                next_cursor = self.encode_cursor(objects[-1])
+            if (has_more and reverse) or (decoded and not reverse):
+                previous_cursor = self.encode_cursor(objects[0], reverse=True)
+        return self.build_page(objects, cursor, next_cursor, previous_cursor)
+
+    def build_page(self, objects, cursor, next_cursor, previous_cursor):
+        """Собирает страницу из готового списка записей и курсоров."""
+        page = Page(objects, 1, self)
+        page.is_cursor = True
+        page.cursor = cursor
+        page.next_cursor = next_cursor
+        page.previous_cursor = previous_cursor
+        return page
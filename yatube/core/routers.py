@@ -0,0 +1,54 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def allow_replicas(allowed):
+    """Разрешает или запрещает текущему потоку читать с реплик."""
+    _state.replicas_allowed = allowed
+
+
+def reading_replicas():
+    return bool(
+        settings.DATABASE_REPLICAS
+        and getattr(_state, 'replicas_allowed', False)
+    )
+
+
+def pin_primary_if_recent(timestamp):
+    """Переводит чтение на основную базу, если данные только что менялись.
+
+    Реплика может ещё не догнать изменение, а прочитанное из неё
+    попало бы в кэш под новой версией.
+    """
+    if (timestamp is not None
+            and time.time() - timestamp < settings.REPLICA_LAG_SECONDS):
+        allow_replicas(False)
+
+
+class ReplicaRouter:
+    """Отправляет чтение на реплики, а запись — на основную базу.
+
+    С реплик читают только потоки, которым это явно разрешено
+    (безопасные запросы через ReplicaMiddleware). Команды, фоновые
+    воркеры и запросы с записью читают основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_replicas():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает на реплики вместе с данными
+        return db == 'default'
@@ -0,0 +1,117 @@
+# Статика для продакшена: collectstatic кладёт каждый файл ещё и под
+# именем с хэшем содержимого и рядом пишет сжатые копии .gz и .br.
+# Такие файлы не меняются никогда, поэтому отдаются с вечным
+# Cache-Control, а сжатие не тратит время запроса.
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import compression
+
+# Сжимаются только текстовые форматы не меньше порога, и копия
+# сохраняется, только если она заметно меньше исходника
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.html', '.json', '.xml',
+)
+MIN_COMPRESS_SIZE = 256
+MIN_SAVING = 0.05
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+# Так ManifestStaticFilesStorage вписывает хэш: name.0123456789ab.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def _compress(content):
+    # Копии пишутся один раз при сборке, поэтому сжатие наибольшее
+    yield '.gz', compression.compress(content, 'gzip', 9)
+    if compression.brotli is not None:
+        yield '.br', compression.compress(content, 'br', 11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хэширует имена статики и пишет рядом сжатые копии.
+
+    Пока collectstatic не собрал манифест, например в тестах и при
+    разработке, {% static %} отдаёт исходные имена.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files.values()) | set(paths)
+        for name in sorted(names):
+            self.compress(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE) or not self.exists(name):
+            return
+        with self.open(name) as source:
+            content = source.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compressed in _compress(content):
+            if len(compressed) > len(content) * (1 - MIN_SAVING):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+
+def serve(request, name):
+    """Ответ с файлом из STATIC_ROOT или None, если такого файла нет.
+
+    Если клиент принимает сжатие и рядом есть сжатая копия, отдаётся
+    она. Файлы с хэшем в имени кэшируются навсегда.
+    """
+    try:
+        path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(path):
+        return None
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding:
+        # Файл .gz или .br, запрошенный напрямую, отдаётся как есть
+        content_type = 'application/octet-stream'
+    accepted = compression.accepted_encodings(request)
+    chosen_path, chosen_encoding = path, None
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(path + suffix):
+            chosen_path, chosen_encoding = path + suffix, coding
+            break
+    stat = os.stat(path)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size
+    ):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(
+            open(chosen_path, 'rb'),
+            content_type=content_type or 'application/octet-stream'
+        )
+        if chosen_encoding:
+            response['Content-Encoding'] = chosen_encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = (
+        IMMUTABLE if HASHED_NAME.search(name) else REVALIDATE
+    )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
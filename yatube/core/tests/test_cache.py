@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from multiprocessing import Process
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+TEMP_CACHE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+WORKERS = 4
+INCREMENTS = 50
+
+
+def _increment(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(INCREMENTS):
+        cache.incr('version')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.location = os.path.join(TEMP_CACHE_DIR, f'{self.id()}.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def test_set_get_and_delete(self):
+        """Значения читаются, пачкой тоже, и удаляются."""
+        self.cache.set('card', {'html': '<p>'}, None)
+        self.cache.set('other', 1)
+        self.assertEqual(self.cache.get('card'), {'html': '<p>'})
+        self.assertEqual(
+            self.cache.get_many(['card', 'other', 'missing']),
+            {'card': {'html': '<p>'}, 'other': 1}
+        )
+        self.cache.delete('card')
+        self.assertIsNone(self.cache.get('card'))
+
+    def test_add_and_expiry(self):
+        """add не затирает живой ключ, а истёкший ключ не читается."""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.cache.set('old', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertTrue(self.cache.add('old', 2))
+
+    def test_incr_missing_key_raises(self):
+        """incr отсутствующего ключа, как и в Django, даёт ValueError."""
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_across_processes(self):
+        """Параллельные воркеры не теряют инкременты версии."""
+        self.cache.set('version', 0, None)
+        workers = [
+            Process(target=_increment, args=(self.location,))
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('version'), WORKERS * INCREMENTS)
+
+    def test_cull_keeps_max_entries(self):
+        """Лишние записи вытесняются при переполнении."""
+        cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_ENTRIES': 10}})
+        for number in range(30):
+            cache.set(f'key_{number}', number)
+        count, = cache._connection.execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()
+        self.assertLessEqual(count, 11)
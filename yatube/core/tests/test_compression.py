@@ -0,0 +1,75 @@
+import gzip
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from .. import compression
+from ..middleware import CompressionMiddleware
+
+PAGE = '<article><p>Карточка поста</p></article>\n' * 100
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def respond(self, response, accept='gzip, deflate'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_page_compressed(self):
+        """Страница сжимается gzip, ETag становится слабым."""
+        page = HttpResponse(PAGE)
+        page['ETag'] = '"version"'
+        response = self.respond(page)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"version"')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content)
+        )
+        self.assertEqual(gzip.decompress(response.content).decode(), PAGE)
+
+    def test_skipped_responses(self):
+        """Короткие ответы, картинки и уже сжатое не трогаются."""
+        encoded = HttpResponse(PAGE)
+        encoded['Content-Encoding'] = 'br'
+        responses = {
+            'short': HttpResponse('<p>коротко</p>'),
+            'image': HttpResponse(b'\xff' * 4096, content_type='image/jpeg'),
+            'encoded': encoded,
+        }
+        for name, original in responses.items():
+            with self.subTest(response=name):
+                content = original.content
+                response = self.respond(original)
+                self.assertEqual(response.content, content)
+                self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+
+    def test_client_without_compression(self):
+        """Без подходящего Accept-Encoding ответ уходит как есть."""
+        for accept in ('', 'identity', 'gzip;q=0'):
+            with self.subTest(accept=accept):
+                response = self.respond(HttpResponse(PAGE), accept)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_streaming_compressed_by_parts(self):
+        """Поток сжимается по частям, и каждая часть доходит сразу."""
+        parts = [part.encode() for part in PAGE.splitlines(keepends=True)]
+        response = self.respond(StreamingHttpResponse(iter(parts)))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)).decode(), PAGE)
+
+    def test_accepted_encodings(self):
+        """Кодировки с q=0 не принимаются."""
+        request = self.factory.get(
+            '/', HTTP_ACCEPT_ENCODING='br;q=0, GZIP;q=0.5, deflate'
+        )
+        self.assertEqual(
+            compression.accepted_encodings(request), {'gzip', 'deflate'}
+        )
+        self.assertEqual(compression.choose_encoding(request), 'gzip')
@@ -0,0 +1,40 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from ..db import apply_sqlite_pragmas
+
+TEMP_DB_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class SQLitePragmaTests(TestCase):
+    def test_connection_tuned_on_open(self):
+        """Соединение Django открывается с настройками из SQLITE_PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone(), (1,))
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(
+                cursor.fetchone(), (settings.SQLITE_PRAGMAS['busy_timeout'],)
+            )
+
+
+class SQLiteFilePragmaTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DB_DIR, ignore_errors=True)
+
+    def test_file_database_switches_to_wal(self):
+        """Файловая база переходит в режим WAL."""
+        raw = sqlite3.connect(os.path.join(TEMP_DB_DIR, 'db.sqlite3'))
+        apply_sqlite_pragmas(raw)
+        self.assertEqual(
+            raw.execute('PRAGMA journal_mode').fetchone(), ('wal',)
+        )
+        raw.close()
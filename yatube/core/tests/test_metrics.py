@@ -0,0 +1,76 @@
+import re
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .. import metrics
+
+SERVER_TIMING = re.compile(
+    r'^sql;desc="(\d+) queries";dur=[\d.]+, tpl;dur=([\d.]+), '
+    r'total;dur=[\d.]+$'
+)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=self.user, text='Тестовый пост')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        """Ответ сообщает число SQL-запросов и время рендеринга."""
+        response = self.client.get(reverse('posts:index'))
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match.group(1)), 0)
+        self.assertGreater(float(match.group(2)), 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_histograms_by_url_name(self):
+        """Замеры копятся в гистограммах по имени адреса."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=(self.user.username,)))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertContains(
+            response,
+            'yatube_view_duration_seconds_count{view="posts:index"} 2\n'
+        )
+        self.assertContains(
+            response,
+            'yatube_view_queries_bucket{view="posts:profile",le="+Inf"} 1\n'
+        )
+        self.assertContains(
+            response, '# TYPE yatube_view_template_seconds histogram\n'
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_for_admins_and_token_only(self):
+        """Метрики видны администраторам и сборщику с токеном."""
+        url = reverse('metrics')
+        guest = Client()
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+                        {'HTTP_AUTHORIZATION': 'secret'}):
+            with self.subTest(headers=headers):
+                self.assertEqual(guest.get(url, **headers).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = guest.get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_empty_token_disables_collector_access(self):
+        """Без настроенного токена пустой Bearer не пускает."""
+        response = Client().get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, 404)
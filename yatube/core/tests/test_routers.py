@@ -0,0 +1,82 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+
+from .. import routers
+from ..management.commands.sync_replicas import copy_database
+from ..middleware import STICKY_COOKIE, ReplicaMiddleware
+
+TEMP_DB_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def read_database(request):
+    # Какую базу выбрал роутер для чтения внутри запроса
+    return HttpResponse(routers.ReplicaRouter().db_for_read(Post))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = ReplicaMiddleware(read_database)
+
+    def test_safe_requests_read_replica(self):
+        """Чтение в GET-запросе идёт на реплику, вне запроса — на основную."""
+        response = self.middleware(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertEqual(routers.ReplicaRouter().db_for_read(Post), 'default')
+        self.assertEqual(
+            routers.ReplicaRouter().db_for_write(Post), 'default'
+        )
+
+    def test_writer_sticks_to_primary(self):
+        """После записи пользователь какое-то время читает основную базу."""
+        response = self.middleware(self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(self.middleware(request).content, b'default')
+
+    def test_recent_change_pins_primary(self):
+        """Только что изменённые данные читаются с основной базы."""
+        routers.allow_replicas(True)
+        try:
+            routers.pin_primary_if_recent(time.time() - 3600)
+            self.assertTrue(routers.reading_replicas())
+            routers.pin_primary_if_recent(time.time())
+            self.assertFalse(routers.reading_replicas())
+        finally:
+            routers.allow_replicas(False)
+
+
+class SyncReplicasTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DB_DIR, ignore_errors=True)
+
+    def test_copy_database(self):
+        """Реплика получает данные основной базы."""
+        primary = os.path.join(TEMP_DB_DIR, 'primary.sqlite3')
+        replica = os.path.join(TEMP_DB_DIR, 'replica.sqlite3')
+        connection = sqlite3.connect(primary)
+        connection.execute('CREATE TABLE post (text TEXT)')
+        connection.execute("INSERT INTO post VALUES ('новый пост')")
+        connection.commit()
+        connection.close()
+        copy_database(primary, replica)
+        connection = sqlite3.connect(replica)
+        self.assertEqual(
+            connection.execute('SELECT text FROM post').fetchall(),
+            [('новый пост',)]
+        )
+        connection.close()
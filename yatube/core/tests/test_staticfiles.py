@@ -0,0 +1,94 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SOURCE_DIR = os.path.join(TEMP_DIR, 'source')
+STATIC_ROOT = os.path.join(TEMP_DIR, 'collected')
+CSS = ('body { background: url("../img/logo.png"); }\n' * 40).encode()
+
+
+@override_settings(STATICFILES_DIRS=[SOURCE_DIR], STATIC_ROOT=STATIC_ROOT)
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(SOURCE_DIR, 'css'))
+        os.makedirs(os.path.join(SOURCE_DIR, 'img'))
+        with open(os.path.join(SOURCE_DIR, 'css', 'site.css'), 'wb') as css:
+            css.write(CSS)
+        with open(os.path.join(SOURCE_DIR, 'img', 'logo.png'), 'wb') as png:
+            png.write(b'\x89PNG\r\n\x1a\n' + b'\x00' * 64)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        call_command(
+            'collectstatic', interactive=False, clear=True, stdout=StringIO()
+        )
+        self.css_url = Template(
+            '{% load static %}{% static "css/site.css" %}'
+        ).render(Context())
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """Файлы получают хэш в имени и сжатую копию рядом."""
+        self.assertRegex(
+            self.css_url, r'^/static/css/site\.[0-9a-f]{12}\.css$'
+        )
+        hashed = os.path.join(STATIC_ROOT, self.css_url[len('/static/'):])
+        with open(hashed, 'rb') as source, \
+                gzip.open(hashed + '.gz') as compressed:
+            content = source.read()
+            self.assertEqual(compressed.read(), content)
+        # Ссылки внутри CSS тоже ведут на имена с хэшем
+        logo = os.path.basename(staticfiles_storage.url('img/logo.png'))
+        self.assertRegex(logo, r'^logo\.[0-9a-f]{12}\.png$')
+        self.assertIn(logo.encode(), content)
+        self.assertFalse(os.path.exists(os.path.join(
+            STATIC_ROOT, staticfiles_storage.stored_name('img/logo.png')
+            + '.gz'
+        )))
+
+    def test_hashed_file_served_compressed_and_immutable(self):
+        """Файл с хэшем отдаётся сжатым и кэшируется навсегда."""
+        response = self.client.get(
+            self.css_url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        with open(os.path.join(
+            STATIC_ROOT, self.css_url[len('/static/'):]
+        ), 'rb') as hashed:
+            self.assertEqual(
+                gzip.decompress(b''.join(response.streaming_content)),
+                hashed.read()
+            )
+
+    def test_plain_file_without_compression(self):
+        """Без сжатия у клиента и для имени без хэша отдаётся исходник."""
+        response = self.client.get(
+            '/static/css/site.css', HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_missing_file_passes_through(self):
+        """Неизвестный файл и выход из STATIC_ROOT не обслуживаются."""
+        for path in ('/static/css/none.css', '/static/../manage.py'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
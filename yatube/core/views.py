@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
 
 
 def page_not_found(request, exception):
@@ -7,3 +12,23 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403.html')
+
+
+def _has_metrics_token(request):
+    token = settings.METRICS_TOKEN
+    scheme, _, given = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and (
+        constant_time_compare(given.strip(), token)
+    )
+
+
+def metrics_view(request):
+    # Метрики в текстовом формате Prometheus: администраторам и сборщику
+    # с токеном из METRICS_TOKEN
+    if not (request.user.is_staff or _has_metrics_token(request)):
+        raise Http404
+    return HttpResponse(
+        metrics.exposition(), content_type='text/plain; version=0.0.4'
+    )
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = "Приложение управления записями"
+
+    def ready(self):
+        from core import metrics
+
+        from . import pagecache, signals  # noqa: F401
+        metrics.register(pagecache.exposition)
@@ -0,0 +1,300 @@
+# Нагрузочный прогон адресов posts.urls на воспроизводимом наборе данных.
+# Данные строятся mixer и Faker, как в фикстурах тестов, но без сохранения
+# по одной строке: готовые объекты уходят в базу пачками через bulk_create,
+# а ленты, счётчики, поисковый индекс и миниатюры потом строятся целиком.
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.test import Client
+from django.urls import reverse
+from mixer.backend.django import Mixer
+
+from core import compression
+
+from . import seeding
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+DATASET = {
+    'users': 2000,
+    'groups': 50,
+    'posts': 200000,
+    'comments': 100000,
+    'follows': 40000,
+    'images': 20,
+}
+BATCH_SIZE = 1000
+# Доля постов с картинкой и крутизна распределения подписчиков по авторам
+IMAGE_SHARE = 0.2
+FOLLOW_SKEW = 1.2
+# От имени этого пользователя идут запросы, которым нужен вход
+READER = 'user0'
+# Уровни сжатия, цену которых меряет compression_cost
+COMPRESSION_LEVELS = (
+    ('gzip', (1, 6, 9)),
+    ('br', (1, 4, 5, 8, 11)),
+)
+
+
+def _zipf_weights(count):
+    return [1 / rank ** FOLLOW_SKEW for rank in range(1, count + 1)]
+
+
+def _create(model, objects):
+    # Размер одного INSERT подбирает бэкенд: у sqlite есть предел
+    # на число параметров
+    with transaction.atomic():
+        model.objects.bulk_create(objects)
+
+
+def seed(sizes=DATASET, seed_value=1, log=print):
+    """Заполняет пустую базу набором данных заданного размера.
+
+    Одинаковые sizes и seed_value дают одинаковые данные.
+    """
+    generator = random.Random(seed_value)
+    mixer = Mixer(commit=False, locale='ru')
+    mixer.faker.seed_instance(seed_value)
+    users = [
+        mixer.blend(User, username=f'user{number}', password='!')
+        for number in range(sizes['users'])
+    ]
+    _create(User, users)
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    log(f'Пользователей: {len(user_ids)}')
+
+    _create(Group, [
+        mixer.blend(Group, slug=f'group-{number}')
+        for number in range(sizes['groups'])
+    ])
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    images = seeding.placeholder_images(sizes['images'], prefix='benchmark')
+
+    # Авторы тоже неравны: немногие пишут большую часть постов
+    author_weights = _zipf_weights(len(user_ids))
+    for start in range(0, sizes['posts'], BATCH_SIZE):
+        count = min(BATCH_SIZE, sizes['posts'] - start)
+        authors = generator.choices(user_ids, author_weights, k=count)
+        _create(Post, [
+            mixer.blend(
+                Post,
+                author_id=author_id,
+                group_id=(
+                    generator.choice(group_ids)
+                    if group_ids and generator.random() < 0.5 else None
+                ),
+                image=(
+                    generator.choice(images)
+                    if images and generator.random() < IMAGE_SHARE else ''
+                ),
+                text=mixer.faker.text,
+            )
+            for author_id in authors
+        ])
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    log(f'Постов: {len(post_ids)}')
+
+    for start in range(0, sizes['comments'], BATCH_SIZE):
+        count = min(BATCH_SIZE, sizes['comments'] - start)
+        _create(Comment, [
+            mixer.blend(
+                Comment,
+                post_id=generator.choice(post_ids),
+                author_id=generator.choice(user_ids),
+                text=mixer.faker.sentence,
+            )
+            for _ in range(count)
+        ])
+    log(f'Комментариев: {sizes["comments"]}')
+
+    # У популярных авторов подписчиков на порядки больше, чем у остальных
+    follows = set()
+    attempts = 0
+    while len(follows) < sizes['follows'] and attempts < sizes['follows'] * 5:
+        attempts += 1
+        user_id = generator.choice(user_ids)
+        author_id = generator.choices(user_ids, author_weights)[0]
+        if user_id != author_id:
+            follows.add((user_id, author_id))
+    _create(Follow, [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in sorted(follows)
+    ])
+    log(f'Подписок: {len(follows)}')
+
+    seeding.build_derived(images, log=log)
+
+
+def scenarios():
+    """Запросы ко всем адресам posts.urls на засеянных данных.
+
+    Каждый элемент: имя, метод, путь, данные формы и нужен ли вход.
+    Адреса лент меряются и для анонима, которому отдаёт кэш страниц.
+    """
+    reader = User.objects.get(username=READER)
+    author = (
+        User.objects.exclude(pk=reader.pk)
+        .order_by('-stats__follower_count', 'pk').first()
+    )
+    post = Post.objects.filter(author=reader).order_by('-pk').first() or (
+        Post.objects.order_by('-comment_count', 'pk').first()
+    )
+    group = Group.objects.order_by('-post_count', 'pk').first()
+    word = max(post.text.split(), key=len).strip('.,')
+    return [
+        ('index', 'GET', reverse('posts:index'), None, True),
+        ('index:anonymous', 'GET', reverse('posts:index'), None, False),
+        ('group_list', 'GET',
+         reverse('posts:group_list', args=(group.slug,)), None, True),
+        ('profile', 'GET',
+         reverse('posts:profile', args=(author.username,)), None, True),
+        ('profile:anonymous', 'GET',
+         reverse('posts:profile', args=(author.username,)), None, False),
+        ('post_detail', 'GET',
+         reverse('posts:post_detail', args=(post.pk,)), None, True),
+        ('post_comments', 'GET',
+         reverse('posts:post_comments', args=(post.pk,)), None, True),
+        ('post_create', 'GET', reverse('posts:post_create'), None, True),
+        ('post_edit', 'GET',
+         reverse('posts:post_edit', args=(post.pk,)), None, True),
+        ('add_comment', 'POST',
+         reverse('posts:add_comment', args=(post.pk,)),
+         {'text': 'Комментарий из нагрузочного прогона'}, True),
+        ('search', 'GET', reverse('posts:search'), {'q': word}, True),
+        ('follow_index', 'GET', reverse('posts:follow_index'), None, True),
+        ('profile_follow', 'GET',
+         reverse('posts:profile_follow', args=(author.username,)),
+         None, True),
+        ('profile_unfollow', 'GET',
+         reverse('posts:profile_unfollow', args=(author.username,)),
+         None, True),
+    ]
+
+
+def percentile(samples, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _client(login):
+    client = Client()
+    if login:
+        client.force_login(User.objects.get(username=READER))
+    return client
+
+
+def _send(client, method, path, data):
+    if method == 'POST':
+        return client.post(path, data)
+    return client.get(path, data)
+
+
+def _run(scenario, count):
+    _, method, path, data, login = scenario
+    client = _client(login)
+    samples = []
+    errors = 0
+    for _ in range(count):
+        started = time.perf_counter()
+        response = _send(client, method, path, data)
+        samples.append(time.perf_counter() - started)
+        errors += response.status_code >= 400
+    return samples, errors
+
+
+def measure(scenario, requests, concurrency=1, warmup=10):
+    """Прогоняет один адрес и считает пропускную способность и задержки.
+
+    При concurrency больше одного запросы идут из нескольких потоков,
+    каждый со своим клиентом и соединением с базой.
+    """
+    results = []
+
+    def worker(count):
+        try:
+            results.append(_run(scenario, count))
+        finally:
+            connections.close_all()
+
+    _run(scenario, warmup)
+    per_worker = max(1, requests // concurrency)
+    started = time.perf_counter()
+    if concurrency == 1:
+        results.append(_run(scenario, per_worker))
+    else:
+        threads = [
+            threading.Thread(target=worker, args=(per_worker,))
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    latencies = [sample for samples, _ in results for sample in samples]
+    return {
+        'path': scenario[2],
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in results),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def compression_cost(pages=5, repeat=20):
+    """Цена сжатия настоящих страниц index: время процессора и экономия.
+
+    Страницы берутся у читателя READER, каждая сжимается repeat раз
+    каждым кодеком и уровнем из COMPRESSION_LEVELS.
+    """
+    client = _client(True)
+    bodies = [
+        client.get(reverse('posts:index'), {'page': page}).content
+        for page in range(1, pages + 1)
+    ]
+    raw = sum(len(body) for body in bodies)
+    codecs = {}
+    for encoding, levels in COMPRESSION_LEVELS:
+        if encoding == 'br' and compression.brotli is None:
+            continue
+        for level in levels:
+            started = time.process_time()
+            for _ in range(repeat):
+                compressed = sum(
+                    len(compression.compress(body, encoding, level))
+                    for body in bodies
+                )
+            cpu_ms = (time.process_time() - started) * 1000 / (
+                repeat * len(bodies)
+            )
+            saved = (raw - compressed) / len(bodies)
+            codecs[f'{encoding}:{level}'] = {
+                'cpu_ms_per_page': round(cpu_ms, 3),
+                'ratio': round(compressed / raw, 3),
+                'saved_bytes_per_page': round(saved),
+                'saved_kb_per_cpu_ms': round(saved / 1024 / cpu_ms, 1),
+            }
+    return {
+        'pages': len(bodies),
+        'bytes_per_page': round(raw / len(bodies)),
+        'codecs': codecs,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Адреса, чья медиана выросла больше чем в 1 + tolerance раз."""
+    slower = []
+    for name, result in results['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if previous and result['p50_ms'] > previous['p50_ms'] * (
+            1 + tolerance
+        ):
+            slower.append((name, previous['p50_ms'], result['p50_ms']))
+    return slower
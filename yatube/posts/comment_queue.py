@@ -0,0 +1,257 @@
+# Отложенная запись комментариев. Проверенный комментарий дописывается
+# в локальную очередь в файле SQLite, а фоновый поток переносит очередь
+# в основную базу пачками, так что писатели не ждут блокировку базы
+# на каждый комментарий.
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import counters, fragments, search
+from .models import Comment, Post, SearchTerm, User
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_worker = None
+_worker_lock = threading.Lock()
+# Через столько секунд строки, взятые упавшим воркером, берутся снова
+CLAIM_TIMEOUT = 5 * 60
+
+
+def _connection():
+    # Соединение своё у каждого потока и у каждого процесса после fork
+    connection = getattr(_local, 'connection', None)
+    location = settings.COMMENT_QUEUE_LOCATION
+    if (connection is None or _local.pid != os.getpid()
+            or _local.location != location):
+        connection = sqlite3.connect(
+            location,
+            timeout=5,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        # Комментарий уже принят, поэтому запись в очередь не должна
+        # пропасть даже при отключении питания
+        connection.execute('PRAGMA synchronous=FULL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS comments ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, post_id INTEGER NOT NULL, '
+            'author_id INTEGER NOT NULL, text TEXT NOT NULL, '
+            'created REAL NOT NULL, claimed REAL)'
+        )
+        columns = {
+            row[1] for row in connection.execute('PRAGMA table_info(comments)')
+        }
+        if 'claimed' not in columns:
+            # Очередь, созданная до появления отметки о переносе
+            connection.execute('ALTER TABLE comments ADD COLUMN claimed REAL')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS comments_post_author '
+            'ON comments (post_id, author_id)'
+        )
+        # Имя очереди отличает её id от id прежней очереди, если файл
+        # пересоздали и нумерация строк началась заново
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS meta ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+        )
+        connection.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('name', ?)",
+            (uuid.uuid4().hex,)
+        )
+        _local.name = connection.execute(
+            "SELECT value FROM meta WHERE key = 'name'"
+        ).fetchone()[0]
+        _local.connection = connection
+        _local.pid = os.getpid()
+        _local.location = location
+    return connection
+
+
+def enqueue(post_id, author_id, text):
+    """Кладёт комментарий в очередь и будит фоновый поток."""
+    _connection().execute(
+        'INSERT INTO comments (post_id, author_id, text, created) '
+        'VALUES (?, ?, ?, ?)',
+        (post_id, author_id, text, time.time())
+    )
+    # Автор должен сразу увидеть свой комментарий, поэтому страница
+    # поста считается изменённой уже сейчас
+    fragments.bump(f'comments:{post_id}')
+    _start_worker()
+
+
+def pending(post_id, author):
+    """Ещё не перенесённые в базу комментарии автора к посту."""
+    rows = _connection().execute(
+        'SELECT id, text, created FROM comments '
+        'WHERE post_id = ? AND author_id = ? ORDER BY id',
+        (post_id, author.pk)
+    ).fetchall()
+    return [
+        Comment(
+            post_id=post_id,
+            author=author,
+            text=text,
+            created=datetime.fromtimestamp(created, timezone.utc),
+        )
+        for _, text, created in rows
+    ]
+
+
+def _queue_key(row_id):
+    _connection()
+    return f'{_local.name}:{row_id}'
+
+
+def _assign_pks(comments):
+    # SQLite не возвращает ключи из bulk_create, поэтому они ищутся
+    # по ключам строк очереди
+    pks = dict(Comment.objects.filter(
+        queue_key__in=[comment.queue_key for comment in comments]
+    ).values_list('queue_key', 'pk'))
+    for comment in comments:
+        comment.pk = pks[comment.queue_key]
+
+
+def _save(rows):
+    post_ids = {post_id for _, post_id, _, _, _ in rows}
+    author_ids = {author_id for _, _, author_id, _, _ in rows}
+    # Пост или автор могли быть удалены, пока комментарий ждал в очереди
+    post_ids = set(
+        Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True)
+    )
+    author_ids = set(
+        User.objects.filter(pk__in=author_ids).values_list('pk', flat=True)
+    )
+    comments = [
+        Comment(
+            post_id=post_id,
+            author_id=author_id,
+            text=text,
+            created=datetime.fromtimestamp(created, timezone.utc),
+            queue_key=_queue_key(row_id),
+        )
+        for row_id, post_id, author_id, text, created in rows
+        if post_id in post_ids and author_id in author_ids
+    ]
+    with transaction.atomic():
+        # Строки, уже перенесённые до падения воркера, пропускаются
+        saved = set(Comment.objects.filter(
+            queue_key__in=[comment.queue_key for comment in comments]
+        ).values_list('queue_key', flat=True))
+        comments = [
+            comment for comment in comments if comment.queue_key not in saved
+        ]
+        created = [comment.created for comment in comments]
+        Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        _assign_pks(comments)
+        # auto_now_add подменяет время при вставке, а комментарий
+        # написан тогда, когда попал в очередь
+        for comment, moment in zip(comments, created):
+            comment.created = moment
+        Comment.objects.bulk_update(comments, ['created'])
+        search.index_objects(SearchTerm.COMMENT, comments)
+        per_post = Counter(comment.post_id for comment in comments)
+        for post_id, count in per_post.items():
+            counters.bump_post(post_id, count)
+    fragments.bump(*(f'comments:{post_id}' for post_id in per_post))
+    return len(comments)
+
+
+def _claim(batch_size):
+    """Помечает пачку строк как переносимую и отдаёт её.
+
+    Очередь блокируется только на выборку и пометку, поэтому
+    enqueue не ждёт, пока пачка пишется в основную базу.
+    """
+    connection = _connection()
+    now = time.time()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        rows = connection.execute(
+            'SELECT id, post_id, author_id, text, created FROM comments '
+            'WHERE claimed IS NULL OR claimed < ? ORDER BY id LIMIT ?',
+            (now - CLAIM_TIMEOUT, batch_size)
+        ).fetchall()
+        connection.executemany(
+            'UPDATE comments SET claimed = ? WHERE id = ?',
+            [(now, row[0]) for row in rows]
+        )
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+    return rows
+
+
+def _flush(batch_size=None):
+    batch_size = batch_size or settings.COMMENT_QUEUE_BATCH_SIZE
+    rows = _claim(batch_size)
+    if not rows:
+        return 0, 0
+    ids = [(row[0],) for row in rows]
+    try:
+        saved = _save(rows)
+    except Exception:
+        _connection().executemany(
+            'UPDATE comments SET claimed = NULL WHERE id = ?', ids
+        )
+        raise
+    _connection().executemany('DELETE FROM comments WHERE id = ?', ids)
+    return len(rows), saved
+
+
+def flush(batch_size=None):
+    """Переносит пачку комментариев из очереди в базу.
+
+    Строки сначала помечаются в очереди, и параллельные воркеры их
+    не берут, затем пишутся в основную базу и только после этого
+    удаляются из очереди. Если воркер упал между записью и удалением,
+    через CLAIM_TIMEOUT пачку возьмут снова, но уже перенесённые строки
+    узнаются по queue_key и второй раз не сохраняются. Возвращает число
+    сохранённых комментариев.
+    """
+    return _flush(batch_size)[1]
+
+
+def flush_all():
+    total = 0
+    while True:
+        claimed, saved = _flush()
+        total += saved
+        if not claimed:
+            return total
+
+
+def _run():
+    while True:
+        try:
+            flush_all()
+        except Exception:
+            logger.exception('Не удалось перенести комментарии из очереди')
+        finally:
+            connections.close_all()
+        time.sleep(settings.COMMENT_QUEUE_FLUSH_INTERVAL)
+
+
+def _start_worker():
+    global _worker
+    if not settings.COMMENT_QUEUE_FLUSH_INTERVAL:
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run, name='comment-queue', daemon=True
+            )
+            _worker.start()
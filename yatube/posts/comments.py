@@ -0,0 +1,36 @@
+# Комментарии поста страницами по курсору из параметра comments.
+# Ими пользуются и страница поста, и её подгрузка, и API.
+from django.utils.functional import SimpleLazyObject
+
+from core.paginators import CursorPaginator
+
+from .models import Comment
+
+num_of_comments: int = 50
+
+
+def _paginator(post_id):
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        num_of_comments,
+        ordering=('created', 'id')
+    )
+
+
+def comments_cursor(request, post_id):
+    """Курсор запрошенной страницы в каноническом виде, без запросов."""
+    return _paginator(post_id).normalize_cursor(request.GET.get('comments'))
+
+
+def comments_page(request, post_id):
+    """Страница комментариев поста по курсору из параметра comments."""
+    return _paginator(post_id).get_cursor_page(request.GET.get('comments'))
+
+
+def lazy_comments_page(request, post_id):
+    """Та же страница, но комментарии читаются при первом обращении.
+
+    Пока фрагмент комментариев лежит в кэше шаблона, к базе
+    за ними не ходят.
+    """
+    return SimpleLazyObject(lambda: comments_page(request, post_id))
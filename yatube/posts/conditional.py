@@ -0,0 +1,116 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core import routers
+
+from . import fragments, pagecache
+from .models import Post
+
+
+def post_names(request, post_id):
+    """Сущности, из которых собрана страница поста."""
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        return None
+    author_id, group_id = post
+    names = [
+        f'post:{post_id}', f'comments:{post_id}', f'author:{author_id}'
+    ]
+    if group_id is not None:
+        names.append(f'group:{group_id}')
+    return names
+
+
+def versioned(names_func):
+    """Условный GET по версиям сущностей, из которых собран ответ.
+
+    names_func(request, *args, **kwargs) отдаёт имена сущностей
+    или None, если ответа нет. ETag считается из их версий,
+    Last-Modified — по времени последнего изменения, поэтому ответ
+    304 отдаётся без запросов к ленте и без рендеринга.
+    Посчитанные значения остаются в request.versioned_etag
+    и request.versioned_last_modified.
+    """
+    def get_names(request, *args, **kwargs):
+        # condition спрашивает ETag и дату по отдельности,
+        # а имена достаточно вычислить один раз за запрос
+        if not hasattr(request, '_versioned_names'):
+            request._versioned_names = names_func(request, *args, **kwargs)
+        return request._versioned_names
+
+    def etag(request, *args, **kwargs):
+        names = get_names(request, *args, **kwargs)
+        if names is None:
+            return None
+        versions = fragments.get_versions(names)
+        path = pagecache.page_path(request.path, request.GET)
+        payload = (path or request.get_full_path()) + ''.join(
+            f'|{name}.{versions[name]}' for name in sorted(versions)
+        )
+        if request.user.is_authenticated:
+            # В странице вошедшего пользователя лежит его CSRF-токен,
+            # а вход заново меняет и токен, и сессию: старая копия
+            # из браузера с устаревшим токеном подходить не должна
+            payload += '|{}|{}'.format(
+                request.META.get('CSRF_COOKIE', ''),
+                request.session.session_key or '',
+            )
+        request.versioned_etag = hashlib.md5(payload.encode()).hexdigest()
+        return request.versioned_etag
+
+    def last_modified(request, *args, **kwargs):
+        names = get_names(request, *args, **kwargs)
+        if names is None:
+            return None
+        timestamp = fragments.last_modified(names)
+        routers.pin_primary_if_recent(timestamp)
+        if timestamp is None:
+            return None
+        request.versioned_last_modified = datetime.fromtimestamp(
+            timestamp, timezone.utc
+        )
+        return request.versioned_last_modified
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def conditional_page(names_func):
+    """Условный GET и заголовки кэширования для HTML-страниц.
+
+    Страница зависит от того, кто её смотрит, поэтому к именам
+    сущностей добавляются версии вошедшего пользователя, а ответ
+    помечается Vary: Cookie. Анонимные страницы одинаковы для всех
+    и могут храниться в общих кэшах, страницы пользователя — только
+    в его браузере, и обе перепроверяются при каждом запросе.
+    Анонимам страницы отдаются из кэша целых страниц.
+    """
+    def page_names(request, *args, **kwargs):
+        names = names_func(request, *args, **kwargs)
+        if names is not None and request.user.is_authenticated:
+            names = [
+                *names,
+                f'author:{request.user.pk}',
+                f'feed:follow:{request.user.pk}',
+            ]
+        return names
+
+    def decorator(view):
+        view = versioned(page_names)(pagecache.anonymous(view))
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated or response.cookies:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, no_cache=True)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Group, ImageBlob, Post
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        # Счётчик не уходит в минус, даже если успел разойтись с данными
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    """Меняет счётчик пользователя, при необходимости заводя ему запись."""
+    with transaction.atomic():
+        stats = AuthorStats.objects.filter(user_id=user_id)
+        if not _bump(stats, field, delta) and delta > 0:
+            AuthorStats.objects.get_or_create(user_id=user_id)
+            _bump(stats, field, delta)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), 'post_count', delta)
+
+
+def bump_post(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comment_count', delta)
+
+
+def acquire_image(name):
+    """Добавляет ссылку поста на файл картинки.
+
+    Возвращает True, если это единственная ссылка: файл мог быть
+    удалён вместе с последней прежней, и его надо проверить.
+    """
+    if not name:
+        return False
+    with transaction.atomic():
+        blobs = ImageBlob.objects.filter(name=name)
+        if not _bump(blobs, 'ref_count', 1):
+            ImageBlob.objects.get_or_create(name=name)
+            _bump(blobs, 'ref_count', 1)
+        return blobs.values_list('ref_count', flat=True).first() == 1
+
+
+def release_image(name):
+    """Убирает ссылку на файл картинки.
+
+    Возвращает True, если ссылок не осталось и файл можно удалить.
+    Строка с нулём ссылок остаётся до удаления файла, см. forget_image.
+    """
+    if not name:
+        return False
+    with transaction.atomic():
+        blobs = ImageBlob.objects.filter(name=name)
+        _bump(blobs, 'ref_count', -1)
+        return blobs.filter(ref_count=0).exists()
+
+
+def forget_image(name):
+    """Удаляет строку файла, если ссылок на него так и не появилось.
+
+    Вызывается внутри транзакции, которая удаляет и сам файл:
+    удаление строки блокирует её, и параллельная ссылка на тот же файл
+    дождётся коммита, а потом запишет файл заново.
+    """
+    return bool(
+        ImageBlob.objects.filter(name=name, ref_count=0).delete()[0]
+    )
+
+
+def _count(model, field, ref='pk'):
+    rows = model.objects.filter(
+        **{field: OuterRef(ref)}
+    ).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(
+        Subquery(rows, output_field=models.IntegerField()), 0
+    )
+
+
+def recount():
+    """Пересчитывает все счётчики по данным в базе."""
+    User = get_user_model()
+    with transaction.atomic():
+        AuthorStats.objects.bulk_create(
+            [
+                AuthorStats(user_id=user_id)
+                for user_id in User.objects.filter(
+                    stats__isnull=True
+                ).values_list('pk', flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+        AuthorStats.objects.update(
+            post_count=_count(Post, 'author', 'user_id'),
+            follower_count=_count(Follow, 'author', 'user_id'),
+            following_count=_count(Follow, 'user', 'user_id'),
+        )
+        Group.objects.update(post_count=_count(Post, 'group'))
+        Post.objects.update(comment_count=_count(Comment, 'post'))
+
+
+def recount_images():
+    """Пересчитывает ссылки на файлы картинок по постам."""
+    with transaction.atomic():
+        ImageBlob.objects.all().delete()
+        ImageBlob.objects.bulk_create(
+            ImageBlob(name=name, ref_count=count)
+            for name, count in Post.objects.exclude(image='')
+            .values_list('image').annotate(count=Count('pk')).order_by()
+        )
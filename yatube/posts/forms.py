@@ -1,6 +1,11 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
 
 from .models import Comment, Post
+from .uploads import ingest_image
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +13,39 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Вместо слишком большого файла обработчик загрузки кладёт заглушку
+        self.oversized_image = getattr(
+            self.files.get('image'), 'oversized', False
+        )
+        if self.oversized_image:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if self.oversized_image:
+            raise forms.ValidationError(
+                'Файл больше %(limit)s, загрузите картинку поменьше.',
+                code='oversized',
+                params={
+                    'limit': filesizeformat(settings.MAX_UPLOAD_IMAGE_SIZE)
+                },
+            )
+        if isinstance(image, UploadedFile):
+            # Заголовок картинки проверен ImageField, но данные могут
+            # оказаться обрезанными или слишком большими при распаковке
+            try:
+                return ingest_image(image)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                raise forms.ValidationError(
+                    'Не удалось прочитать картинку: файл повреждён '
+                    'или слишком велик.',
+                    code='invalid_image',
+                )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,281 @@
+# Кэш страниц лент: в ключ входят версии сущностей, а записи поднимают
+# версии только затронутых. Карточки постов
+# рендерятся при записи и хранятся в самом посте, лента их только
+# склеивает.
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from core import routers
+
+from .models import Follow, Post
+
+CARD_TEMPLATE = 'includes/post.html'
+BODY_TEMPLATE = 'includes/post_body.html'
+# Число постов автора меняется с каждым его постом, поэтому в сохранённой
+# карточке вместо него метка, которую заменяют при выводе
+COUNT_SLOT = '<!--post-count-->'
+RERENDER_CHUNK_SIZE = 500
+# Устаревшие страницы никто не удаляет, поэтому им нужен срок жизни
+CURSOR_PAGE_TIMEOUT = 24 * 60 * 60
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def _modified_key(name):
+    return f'modified:{name}'
+
+
+def _new_version():
+    # Версия от времени, чтобы после вытеснения ключа из кэша
+    # не совпасть со старыми фрагментами
+    return int(time.time() * 1000000)
+
+
+def get_versions(names):
+    """Отдаёт словарь {имя: версия}, заводя недостающие версии."""
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    for key, name in keys.items():
+        if name not in versions:
+            # Время изменения неизвестно, поэтому считаем им текущее
+            cache.add(_modified_key(name), time.time(), None)
+            cache.add(key, _new_version(), None)
+            versions[name] = cache.get(key)
+    return versions
+
+
+def get_version(name):
+    return get_versions([name])[name]
+
+
+def bump(*names):
+    """Поднимает версии сущностей, чьё представление изменилось."""
+    for name in names:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+        cache.set(_modified_key(name), time.time(), None)
+
+
+def last_modified(names):
+    """Unix-время последнего изменения сущностей или None."""
+    found = cache.get_many([_modified_key(name) for name in names])
+    return max(found.values(), default=None)
+
+
+def read_fresh(names):
+    """Читает с основной базы, если сущности менялись только что."""
+    if routers.reading_replicas():
+        routers.pin_primary_if_recent(last_modified(names))
+
+
+def feed_names(author_id, group_id):
+    """Ленты, в которых показывается пост автора из группы.
+
+    Ленты подписок отдельно не поднимаются: их версия складывается
+    из версий профилей авторов, см. followed_feeds.
+    """
+    names = ['feed:index', f'feed:profile:{author_id}']
+    if group_id is not None:
+        names.append(f'feed:group:{group_id}')
+    return names
+
+
+def followed_feeds(user_id):
+    """Ленты профилей авторов, на которых подписан читатель.
+
+    От их версий зависит лента подписок: новый пост автора поднимает
+    только версию его профиля, а не ленты всех подписчиков, поэтому
+    запись поста стоит одного поднятия версии, сколько бы у автора
+    ни было читателей. Сама feed:follow меняется при подписке и отписке,
+    и по её версии кэшируется список подписок.
+    """
+    key = f'followed:{user_id}.{get_version(f"feed:follow:{user_id}")}'
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = list(Follow.objects.filter(user_id=user_id).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True))
+        cache.set(key, author_ids, None)
+    return [f'feed:profile:{author_id}' for author_id in author_ids]
+
+
+def group_authors(group_id):
+    """Версии авторов, чьи посты есть в группе.
+
+    Карточки ленты группы показывают число постов автора, а оно
+    меняется и от постов в других группах. Список авторов меняется
+    только вместе с лентой группы, поэтому кэшируется по её версии.
+    """
+    key = f'group_authors:{group_id}.{get_version(f"feed:group:{group_id}")}'
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = list(Post.objects.filter(group_id=group_id).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True).distinct())
+        cache.set(key, author_ids, None)
+    return [f'author:{author_id}' for author_id in author_ids]
+
+
+def _render(post):
+    # Команды отключают перевод, а месяц в дате карточки нужен по-русски
+    with translation.override(settings.LANGUAGE_CODE):
+        body = render_to_string(BODY_TEMPLATE, {'post': post})
+        card = render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'body': mark_safe(body),
+            'post_count': mark_safe(COUNT_SLOT),
+        })
+    return card, body
+
+
+def store_cards(posts):
+    """Рендерит и сохраняет карточки и тексты постов одним запросом.
+
+    Посты должны быть с автором и группой, как из Post.objects.for_feed().
+    """
+    posts = list(posts)
+    for post in posts:
+        post.card_html, post.body_html = _render(post)
+    Post.objects.bulk_update(posts, ['card_html', 'body_html'])
+    return posts
+
+
+def rerender(post_ids, chunk_size=RERENDER_CHUNK_SIZE):
+    """Перерисовывает сохранённые карточки постов кусками."""
+    post_ids = sorted(post_ids)
+    for start in range(0, len(post_ids), chunk_size):
+        store_cards(Post.objects.for_feed().filter(
+            pk__in=post_ids[start:start + chunk_size]
+        ))
+
+
+def _rerender_and_bump(post_ids, names):
+    rerender(post_ids)
+    # Страницы, закэшированные до перерисовки, рисуются заново
+    bump(*names)
+
+
+def _rerender_in_worker(post_ids, names):
+    try:
+        _rerender_and_bump(post_ids, names)
+    except Exception:
+        logger.exception('Не удалось перерисовать карточки постов')
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CARD_RENDER_WORKERS,
+                thread_name_prefix='cards',
+            )
+    return _executor
+
+
+def _submit(post_ids, names):
+    if settings.CARD_RENDER_WORKERS:
+        _get_executor().submit(_rerender_in_worker, post_ids, names)
+    else:
+        _rerender_and_bump(post_ids, names)
+
+
+def rerender_later(post_ids, names=()):
+    """Перерисовывает карточки постов после коммита в фоновом потоке.
+
+    Так переименование группы или автора с тысячами постов не держит
+    запрос. Затем поднимаются версии names.
+    """
+    post_ids = list(post_ids)
+    if post_ids:
+        names = tuple(names)
+        transaction.on_commit(lambda: _submit(post_ids, names))
+
+
+def attach_cards(posts):
+    """Сохраняет карточки постам ленты, у которых их ещё нет.
+
+    Такие посты записаны в обход сигналов, например при засеве базы.
+    """
+    posts = list(posts)
+    missing = [post for post in posts if not post.card_html]
+    if missing:
+        store_cards(missing)
+    return posts
+
+
+def render_card(post):
+    """HTML карточки: сохранённый фрагмент и текущее число постов автора."""
+    if not post.card_html:
+        store_cards([post])
+    return post.card_html.replace(
+        COUNT_SLOT, str(post.author.stats.post_count), 1
+    )
+
+
+def render_body(post):
+    """Картинка и текст поста для его страницы."""
+    if not post.body_html:
+        store_cards([post])
+    return post.body_html
+
+
+def cursor_page(paginator, cursor, feed, depends=()):
+    """Страница ленты по курсору со списком постов из кэша.
+
+    В кэше лежат id постов страницы и курсоры соседних страниц,
+    поэтому при попадании посты достаются по первичному ключу.
+    depends — версии, от которых лента зависит помимо своей.
+    """
+    # Ключ строится по разобранному курсору, чтобы произвольные строки
+    # не плодили записей в кэше
+    cursor = paginator.normalize_cursor(cursor)
+    names = [feed, *depends]
+    read_fresh(names)
+    versions = get_versions(names)
+    version = versions[feed]
+    if depends:
+        version = hashlib.md5(' '.join(
+            f'{name}.{versions[name]}' for name in names
+        ).encode()).hexdigest()
+    key = f'page:{feed}.{version}:{paginator.per_page}:{cursor}'
+    cached = cache.get(key)
+    if cached is None:
+        page = paginator.get_cursor_page(cursor)
+        cache.set(key, {
+            'ids': [obj.pk for obj in page],
+            'cursor': page.cursor,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }, CURSOR_PAGE_TIMEOUT)
+        return page
+    objects = paginator.object_list.in_bulk(cached['ids'])
+    return paginator.build_page(
+        [objects[pk] for pk in cached['ids'] if pk in objects],
+        cached['cursor'],
+        cached['next_cursor'],
+        cached['previous_cursor'],
+    )
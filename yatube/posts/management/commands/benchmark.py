@@ -0,0 +1,151 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from posts import benchmark
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Засевает отдельную базу воспроизводимым набором данных и меряет '
+        'пропускную способность и p50/p99 всех адресов posts.urls'
+    )
+
+    def add_arguments(self, parser):
+        for name, size in benchmark.DATASET.items():
+            parser.add_argument(f'--{name}', type=int, default=size)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--reseed', action='store_true',
+            help='Пересоздать базу, даже если данные уже засеяны'
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--routes', nargs='*',
+            help='Мерить только перечисленные адреса, compression — '
+                 'цену сжатия страниц index'
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--baseline',
+            help='Прежние результаты: медленнее них прогон завершится ошибкой'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост медианы, доля от прежней'
+        )
+
+    def handle(self, *args, **options):
+        # Прогон идёт на своей базе, своём каталоге картинок, своём кэше
+        # и своей очереди комментариев, как тесты: общий кэш и очередь
+        # отдали бы посетителям страницы и комментарии прогона. Засеянные
+        # данные переиспользуются следующими запусками
+        connection = connections['default']
+        test_settings = connection.settings_dict['TEST']
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            test_settings['NAME'] = os.path.join(
+                settings.BASE_DIR, 'benchmark.sqlite3'
+            )
+        old_name = connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+            keepdb=not options['reseed'],
+        )
+        try:
+            with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=['testserver'],
+                DATABASE_REPLICAS=[],
+                MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'benchmark_media'),
+                CACHES={'default': {
+                    'BACKEND':
+                        'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark',
+                }},
+                COMMENT_QUEUE_LOCATION=os.path.join(
+                    settings.BASE_DIR, 'benchmark_comments.sqlite3'
+                ),
+            ):
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=True
+            )
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if options['baseline']:
+            self.compare(results, options)
+
+    def run(self, options):
+        if not Post.objects.exists():
+            sizes = {name: options[name] for name in benchmark.DATASET}
+            benchmark.seed(sizes, options['seed'], log=self.stdout.write)
+        results = {
+            'seed': options['seed'],
+            'database': connections['default'].vendor,
+            'concurrency': options['concurrency'],
+            'dataset': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'routes': {},
+        }
+        for scenario in benchmark.scenarios():
+            name = scenario[0]
+            if options['routes'] and name not in options['routes']:
+                continue
+            result = benchmark.measure(
+                scenario,
+                options['requests'],
+                options['concurrency'],
+                options['warmup'],
+            )
+            results['routes'][name] = result
+            self.stdout.write(
+                f'{name:<20} {result["rps"]:8.1f} запр/с  '
+                f'p50 {result["p50_ms"]:8.2f} мс  '
+                f'p99 {result["p99_ms"]:8.2f} мс  '
+                f'ошибок {result["errors"]}'
+            )
+        if not options['routes'] or 'compression' in options['routes']:
+            results['compression'] = benchmark.compression_cost()
+            self.write_compression(results['compression'])
+        return results
+
+    def write_compression(self, result):
+        self.stdout.write(
+            f'Сжатие index: {result["pages"]} стр. '
+            f'по {result["bytes_per_page"]} байт'
+        )
+        for name, codec in result['codecs'].items():
+            self.stdout.write(
+                f'{name:<20} {codec["cpu_ms_per_page"]:8.3f} мс/стр.  '
+                f'доля {codec["ratio"]:.3f}  '
+                f'экономия {codec["saved_bytes_per_page"]} байт/стр.  '
+                f'{codec["saved_kb_per_cpu_ms"]} КБ на мс'
+            )
+
+    def compare(self, results, options):
+        with open(options['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)
+        slower = benchmark.regressions(
+            results, baseline, options['tolerance']
+        )
+        if slower:
+            raise CommandError('Адреса стали медленнее: ' + ', '.join(
+                f'{name} p50 {before} → {after} мс'
+                for name, before, after in slower
+            ))
+        self.stdout.write(self.style.SUCCESS('Медленнее прежнего нет'))
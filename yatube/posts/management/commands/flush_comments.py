@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import comment_queue
+
+
+class Command(BaseCommand):
+    help = 'Переносит в базу комментарии из очереди отложенной записи'
+
+    def handle(self, *args, **options):
+        saved = comment_queue.flush_all()
+        self.stdout.write(
+            self.style.SUCCESS(f'Перенесено комментариев: {saved}')
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Генерирует миниатюры для картинок всех постов'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').values_list('pk', 'image')
+        for post_id, name in posts.iterator():
+            thumbnails.generate(post_id, name)
+        self.stdout.write(self.style.SUCCESS('Миниатюры сгенерированы'))
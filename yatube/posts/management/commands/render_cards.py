@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import fragments
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Перерисовывает сохранённые карточки и тексты всех постов, '
+        'например после правки шаблонов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=fragments.RERENDER_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        last_pk = 0
+        done = 0
+        while True:
+            # Посты идут кусками по первичному ключу, без OFFSET
+            posts = fragments.store_cards(
+                Post.objects.for_feed().filter(pk__gt=last_pk)
+                .order_by('pk')[:options['chunk_size']]
+            )
+            if not posts:
+                break
+            last_pk = posts[-1].pk
+            done += len(posts)
+        self.stdout.write(self.style.SUCCESS(
+            f'Карточки перерисованы: {done}'
+        ))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import seeding
+
+DEFAULT_SIZES = {
+    'users': 10000,
+    'groups': 100,
+    'posts': 1000000,
+    'comments': 1000000,
+    'follows': 100000,
+    'images': 50,
+}
+DERIVED = ('timeline', 'search', 'thumbnails')
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро заполняет базу пользователями, группами, постами, '
+        'комментариями, подписками и картинками-заглушками'
+    )
+
+    def add_arguments(self, parser):
+        for name, size in DEFAULT_SIZES.items():
+            parser.add_argument(f'--{name}', type=int, default=size)
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='Одинаковый seed и размеры дают одинаковые данные'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Процессы для записи на postgres, sqlite пишет в один'
+        )
+        parser.add_argument(
+            '--password',
+            help='Общий пароль пользователей, без него войти нельзя'
+        )
+        parser.add_argument(
+            '--skip', nargs='*', choices=DERIVED, default=(),
+            help='Не строить ленты, поисковый индекс или миниатюры'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        plan = seeding.seed(
+            sizes,
+            options['seed'],
+            options['processes'],
+            options['password'],
+            log=self.stdout.write,
+        )
+        seeding.build_derived(
+            plan['images'], options['skip'], log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.0f} с'
+        ))
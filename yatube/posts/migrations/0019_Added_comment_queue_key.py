@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_Added_rendered_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='queue_key',
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, null=True,
+                unique=True
+            ),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 NUM_OF_WORDS = 15
 User = get_user_model()
 
@@ -11,11 +13,22 @@ class Group(models.Model):
     slug = models.SlugField(unique=True,
                             verbose_name='Уникальный URL')
     description = models.TextField(verbose_name='Описание')
+    post_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
 
     def __str__(self):
         return f'{self.title}'
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты с автором, его счётчиками и группой для ленты."""
+        return self.select_related('author__stats', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста',
                             help_text='Изложите свои мысли здесь')
@@ -39,14 +52,58 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Варианты картинки для <picture> в JSON, их пишет posts.variants
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки'
+    )
+    # Готовый HTML карточки и страницы поста, его пишет posts.fragments
+    card_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='HTML карточки'
+    )
+    body_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='HTML текста'
+    )
+
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:NUM_OF_WORDS]
 
     class Meta:
         ordering = ("-pub_date",)
+        # Ленты сортируются по (pub_date, id), индексы повторяют этот порядок
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            # Авторы группы, от версий которых зависит её страница
+            models.Index(
+                fields=['group', 'author'], name='post_group_author_idx'
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -65,6 +122,18 @@ class Comment(models.Model):
                             help_text='Поделитесь своим мнением')
     created = models.DateTimeField(auto_now_add=True,
                                    verbose_name='Время комментария')
+    # Строка очереди отложенной записи, из которой перенесён комментарий:
+    # повторный перенос той же строки не создаёт дубль
+    queue_key = models.CharField(
+        max_length=64, null=True, blank=True, unique=True, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -80,3 +149,112 @@ class Follow(models.Model):
         verbose_name='Блоггер',
         on_delete=models.CASCADE
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='follow_user_author_unique'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые обновляются сигналами."""
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    follower_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+
+
+class ImageBlob(models.Model):
+    """Число постов, ссылающихся на файл картинки.
+
+    Файл с одинаковым содержимым хранится один раз и удаляется,
+    когда на него не остаётся ссылок.
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Файл'
+    )
+    ref_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная по подписчикам при публикации."""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        verbose_name='Читатель',
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        verbose_name='Автор поста',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    """Строка инвертированного индекса: основа слова в документе."""
+    POST = 'post'
+    COMMENT = 'comment'
+    GROUP = 'group'
+    KINDS = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+        (GROUP, 'Группа'),
+    )
+    term = models.CharField(max_length=64, verbose_name='Основа слова')
+    kind = models.CharField(
+        max_length=10,
+        choices=KINDS,
+        verbose_name='Тип документа'
+    )
+    object_id = models.PositiveIntegerField(verbose_name='Документ')
+    frequency = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Число вхождений'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'kind'], name='search_term_idx'),
+            models.Index(
+                fields=['kind', 'object_id'], name='search_document_idx'
+            ),
+        ]
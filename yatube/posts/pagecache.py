@@ -0,0 +1,183 @@
+# Кэш целых страниц для анонимных читателей. Страница хранится под своим
+# адресом вместе с ETag, посчитанным по версиям показанных сущностей:
+# запись, поднявшая версию ленты или поста, сразу делает страницу
+# устаревшей, и это работает как сброс по тегам.
+import hashlib
+import time
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from core import compression
+
+OUTCOMES = ('hit', 'stale', 'miss')
+# Параметры, от которых зависят страницы лент и поста. Адрес с другими
+# параметрами в кэш не кладётся, иначе ?x=1, ?x=2 и так далее
+# заполнили бы его копиями одной страницы
+PAGE_PARAMS = ('page', 'cursor', 'comments')
+
+
+def page_path(path, params):
+    """Адрес страницы с упорядоченными параметрами или None.
+
+    Из повторов параметра берётся последний, как это делает
+    QueryDict.get. None — в адресе есть посторонние параметры.
+    """
+    if not set(params) <= set(PAGE_PARAMS):
+        return None
+    query = urlencode([
+        (name, params.get(name)) for name in PAGE_PARAMS if name in params
+    ])
+    return f'{path}?{query}'
+
+
+def page_key(path, params):
+    """Ключ страницы в кэше или None, если её не кэшируют."""
+    page = page_path(path, params)
+    if page is None:
+        return None
+    return f'pagecache:{hashlib.md5(page.encode()).hexdigest()}'
+
+
+def _count(outcome):
+    key = f'pagecache:stats:{outcome}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def stats():
+    """Счётчики попаданий, устаревших отдач и промахов и доля попаданий."""
+    found = cache.get_many([f'pagecache:stats:{name}' for name in OUTCOMES])
+    counters = {
+        name: found.get(f'pagecache:stats:{name}', 0) for name in OUTCOMES
+    }
+    total = sum(counters.values())
+    counters['hit_ratio'] = (
+        (counters['hit'] + counters['stale']) / total if total else 0.0
+    )
+    return counters
+
+
+def exposition():
+    """Счётчики для /metrics в текстовом формате Prometheus."""
+    lines = []
+    for name, value in stats().items():
+        metric = f'yatube_page_cache_{name}'
+        kind = 'gauge' if name == 'hit_ratio' else 'counter'
+        lines.extend((f'# TYPE {metric} {kind}', f'{metric} {value}'))
+    return lines
+
+
+def _compressed(response):
+    """Сжатые копии страницы, чтобы попадания не сжимали её заново."""
+    if not compression.compressible(response):
+        return {}
+    encoded = {}
+    for encoding in compression.available_encodings():
+        content = compression.compress(response.content, encoding)
+        if len(content) < len(response.content):
+            encoded[encoding] = content
+    return encoded
+
+
+def _response(request, entry, outcome):
+    encoded = entry.get('encoded', {})
+    encoding = compression.choose_encoding(request)
+    etag = quote_etag(entry['etag'])
+    if encoding in encoded:
+        response = HttpResponse(encoded[encoding], entry['content_type'])
+        response['Content-Encoding'] = encoding
+        etag = compression.weak_etag(etag)
+    else:
+        response = HttpResponse(entry['content'], entry['content_type'])
+    if encoded:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['ETag'] = etag
+    if entry['last_modified']:
+        response['Last-Modified'] = entry['last_modified']
+    response['X-Page-Cache'] = outcome
+    return response
+
+
+def _recently_modified(request):
+    modified = getattr(request, 'versioned_last_modified', None)
+    return modified is not None and (
+        time.time() - modified.timestamp() <= settings.PAGE_CACHE_STALE_SECONDS
+    )
+
+
+def _take_lock(key):
+    """Блокировка перерисовки страницы: её метка или None, если занята.
+
+    Первый запрос после изменения забирает блокировку и рисует
+    страницу, остальные в пределах PAGE_CACHE_STALE_SECONDS получают
+    прежнюю версию.
+    """
+    token = uuid.uuid4().hex
+    if cache.add(f'{key}:lock', token, settings.PAGE_CACHE_LOCK_SECONDS):
+        return token
+    return None
+
+
+def _release_lock(key, token):
+    # Блокировка могла истечь и достаться другому запросу: её не трогаем
+    if cache.get(f'{key}:lock') == token:
+        cache.delete(f'{key}:lock')
+
+
+def anonymous(view):
+    """Отдаёт анонимам страницу из кэша, не вызывая view.
+
+    Должен стоять под versioned: ETag берётся из request.versioned_etag.
+    """
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        etag = getattr(request, 'versioned_etag', None)
+        if (etag is None or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+        key = page_key(request.path, request.GET)
+        if key is None:
+            return view(request, *args, **kwargs)
+        entry = cache.get(key)
+        lock = None
+        if entry is not None:
+            if entry['etag'] == etag:
+                _count('hit')
+                return _response(request, entry, 'hit')
+            if _recently_modified(request):
+                lock = _take_lock(key)
+                if lock is None:
+                    _count('stale')
+                    return _response(request, entry, 'stale')
+        _count('miss')
+        response = view(request, *args, **kwargs)
+        cacheable = (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+        if cacheable:
+            modified = getattr(request, 'versioned_last_modified', None)
+            cache.set(key, {
+                'etag': etag,
+                'last_modified': modified and http_date(modified.timestamp()),
+                'content': response.content,
+                'encoded': _compressed(response),
+                'content_type': response['Content-Type'],
+            }, settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        if lock is not None:
+            _release_lock(key, lock)
+        return response
+    return inner
@@ -0,0 +1,164 @@
+import math
+import re
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import (Case, Count, ExpressionWrapper, F, Sum, Value,
+                              When)
+
+from .models import Comment, Group, Post, SearchTerm
+from .stemmer import stem
+
+BATCH_SIZE = 1000
+MAX_QUERY_TERMS = 8
+TERM_LENGTH = 64
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от',
+    'меня', 'еще', 'нет', 'о', 'из', 'ему', 'ли', 'если', 'уже', 'или',
+    'ни', 'быть', 'был', 'до', 'вас', 'нибудь', 'опять', 'уж', 'вам',
+    'ведь', 'там', 'потом', 'себя', 'ничего', 'ей', 'может', 'они', 'тут',
+    'где', 'есть', 'надо', 'ней', 'для', 'мы', 'тебя', 'их', 'чем', 'была',
+    'сам', 'чтоб', 'без', 'будто', 'чего', 'раз', 'тоже', 'себе', 'под',
+    'будет', 'ж', 'тогда', 'кто', 'этот', 'того', 'потому', 'этого',
+    'какой', 'совсем', 'ним', 'здесь', 'этом', 'один', 'почти', 'мой',
+    'тем', 'чтобы', 'нее', 'были', 'куда', 'зачем', 'всех', 'можно', 'при',
+    'об', 'это', 'эти', 'the', 'a', 'an', 'of', 'to', 'in', 'and', 'is',
+))
+# Совпадение в названии группы важнее, чем в тексте комментария
+KIND_WEIGHTS = {
+    SearchTerm.POST: 1.0,
+    SearchTerm.COMMENT: 0.5,
+    SearchTerm.GROUP: 2.0,
+}
+KIND_MODELS = {
+    SearchTerm.POST: (Post, 'text'),
+    SearchTerm.COMMENT: (Comment, 'text'),
+    SearchTerm.GROUP: (Group, 'title'),
+}
+
+
+def terms(text):
+    """Разбивает текст на основы слов без стоп-слов."""
+    words = re.findall(r'\w+', text.lower().replace('ё', 'е'))
+    return [
+        stem(word)[:TERM_LENGTH]
+        for word in words
+        if word not in STOP_WORDS and len(word) > 1
+    ]
+
+
+def _rows(kind, object_id, text):
+    return [
+        SearchTerm(
+            term=term, kind=kind, object_id=object_id, frequency=frequency
+        )
+        for term, frequency in Counter(terms(text)).items()
+    ]
+
+
+def index_object(kind, obj):
+    """Переиндексирует один документ."""
+    field = KIND_MODELS[kind][1]
+    with transaction.atomic():
+        remove_object(kind, obj.pk)
+        SearchTerm.objects.bulk_create(
+            _rows(kind, obj.pk, getattr(obj, field))
+        )
+
+
+def index_objects(kind, objects):
+    """Индексирует пачку новых документов одной вставкой."""
+    field = KIND_MODELS[kind][1]
+    SearchTerm.objects.bulk_create(
+        [
+            row
+            for obj in objects
+            for row in _rows(kind, obj.pk, getattr(obj, field))
+        ]
+    )
+
+
+def remove_object(kind, object_id):
+    SearchTerm.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild():
+    """Строит индекс заново по всем постам, комментариям и группам."""
+    with transaction.atomic():
+        SearchTerm.objects.all().delete()
+        for kind, (model, field) in KIND_MODELS.items():
+            rows = []
+            documents = model.objects.values_list('pk', field)
+            for object_id, text in documents.iterator():
+                rows.extend(_rows(kind, object_id, text))
+                if len(rows) >= BATCH_SIZE:
+                    SearchTerm.objects.bulk_create(rows)
+                    rows = []
+            SearchTerm.objects.bulk_create(rows)
+
+
+def search(query):
+    """Отдаёт документы, где есть все слова запроса, по убыванию TF-IDF.
+
+    Каждая строка результата: kind, object_id и score.
+    """
+    query_terms = list(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return SearchTerm.objects.none()
+    document_frequency = dict(
+        SearchTerm.objects.filter(term__in=query_terms)
+        .values_list('term')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    documents = Post.objects.count() + Comment.objects.count() + (
+        Group.objects.count()
+    )
+    idf = Case(
+        *(
+            When(term=term, then=Value(
+                math.log(1 + documents / document_frequency.get(term, 1))
+            ))
+            for term in query_terms
+        ),
+        output_field=models.FloatField()
+    )
+    kind_weight = Case(
+        *(
+            When(kind=kind, then=Value(weight))
+            for kind, weight in KIND_WEIGHTS.items()
+        ),
+        output_field=models.FloatField()
+    )
+    return (
+        SearchTerm.objects.filter(term__in=query_terms)
+        .values('kind', 'object_id')
+        .annotate(
+            matched=Count('term', distinct=True),
+            score=Sum(ExpressionWrapper(
+                F('frequency') * idf * kind_weight,
+                output_field=models.FloatField()
+            )),
+        )
+        .filter(matched=len(query_terms))
+        .order_by('-score', '-object_id')
+    )
+
+
+def load_objects(hits):
+    """Подставляет в строки результата сами посты, комментарии и группы."""
+    querysets = {
+        SearchTerm.POST: Post.objects.for_feed(),
+        SearchTerm.COMMENT: Comment.objects.select_related('post', 'author'),
+        SearchTerm.GROUP: Group.objects.all(),
+    }
+    hits = list(hits)
+    for kind, queryset in querysets.items():
+        ids = [hit['object_id'] for hit in hits if hit['kind'] == kind]
+        objects = queryset.in_bulk(ids) if ids else {}
+        for hit in hits:
+            if hit['kind'] == kind:
+                hit['object'] = objects.get(hit['object_id'])
+    return [hit for hit in hits if hit.get('object') is not None]
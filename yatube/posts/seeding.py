@@ -0,0 +1,311 @@
+# Быстрое заполнение базы для стендов и нагрузочных прогонов. Строки
+# получают заранее известные id и пишутся через bulk_create кусками,
+# по транзакции на кусок, без сигналов. Каждый кусок строится своим
+# генератором случайных чисел от seed и номера куска, поэтому данные
+# не зависят от числа процессов. Ленты, счётчики и поисковый индекс
+# потом строятся целиком.
+import random
+from bisect import bisect
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+from multiprocessing import Pool
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker.providers.lorem.ru_RU import Provider
+from PIL import Image
+
+from . import counters, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+CHUNK_SIZE = 10000
+WORDS = Provider.word_list
+# Доля постов с картинкой и в группе, крутизна распределения
+# подписчиков по авторам и глубина истории постов
+IMAGE_SHARE = 0.2
+GROUP_SHARE = 0.5
+FOLLOW_SKEW = 1.2
+HISTORY = timedelta(days=365 * 3)
+
+
+def placeholder_images(count, prefix='seed'):
+    """Сохраняет count однотонных картинок и отдаёт их имена."""
+    names = []
+    for number in range(count):
+        color = (number * 47 % 256, number * 101 % 256, number * 173 % 256)
+        content = BytesIO()
+        Image.new('RGB', (1200, 800), color).save(content, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/{prefix}_{number}.jpg', ContentFile(content.getvalue())
+        ))
+    return names
+
+
+@contextmanager
+def explicit_dates():
+    """Даёт записать свои даты в поля с auto_now_add.
+
+    bulk_create иначе проставит всем строкам текущее время.
+    """
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _text(generator, low, high):
+    words = generator.choices(WORDS, k=generator.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _rng(plan, table, index):
+    return random.Random(f'{plan["seed"]}:{table}:{index}')
+
+
+def _zipf(count):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(accumulate(1 / rank ** FOLLOW_SKEW for rank in range(
+        1, count + 1
+    )))
+
+
+def _moment(plan, share):
+    return plan['start'] + (plan['end'] - plan['start']) * share
+
+
+def _post_share(plan, pk):
+    # Доля истории, на которую приходится пост: посты идут по времени
+    # в порядке id, как при обычной записи
+    first, last = plan['posts']
+    return (pk - first) / max(1, last - first)
+
+
+def _posts(plan, index, start, stop):
+    generator = _rng(plan, 'posts', index)
+    users, groups = plan['users'], plan['groups']
+    posts = []
+    for pk in range(start, stop):
+        group = None
+        if groups[1] > groups[0] and generator.random() < GROUP_SHARE:
+            group = generator.randrange(*groups)
+        image = ''
+        if plan['images'] and generator.random() < IMAGE_SHARE:
+            image = generator.choice(plan['images'])
+        posts.append(Post(
+            pk=pk,
+            author_id=generator.randrange(*users),
+            group_id=group,
+            image=image,
+            text=_text(generator, 8, 80),
+            pub_date=_moment(plan, _post_share(plan, pk)),
+        ))
+    return posts
+
+
+def _comments(plan, index, start, stop):
+    generator = _rng(plan, 'comments', index)
+    comments = []
+    for pk in range(start, stop):
+        post_id = generator.randrange(*plan['posts'])
+        # Комментарий пишут после поста, но не позже конца истории
+        share = _post_share(plan, post_id)
+        comments.append(Comment(
+            pk=pk,
+            post_id=post_id,
+            author_id=generator.randrange(*plan['users']),
+            text=_text(generator, 3, 25),
+            created=_moment(plan, share + (1 - share) * generator.random()),
+        ))
+    return comments
+
+
+def _follows(plan, index, start, stop):
+    # Кусок подписок — это подписки читателей с id от start до stop, так
+    # пары из разных кусков не повторяются. Авторы выбираются по закону
+    # Ципфа: у немногих популярных авторов большая часть подписчиков
+    generator = _rng(plan, 'follows', index)
+    first, last = plan['users']
+    weights = _zipf(last - first)
+    wanted = round((stop - start) * plan['follows_per_user'])
+    pairs = set()
+    attempts = 0
+    while len(pairs) < wanted and attempts < wanted * 5:
+        attempts += 1
+        user_id = generator.randrange(start, stop)
+        rank = bisect(weights, generator.random() * weights[-1])
+        author_id = first + min(rank, last - first - 1)
+        if user_id != author_id:
+            pairs.add((user_id, author_id))
+    return [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in sorted(pairs)
+    ]
+
+
+BUILDERS = {
+    'posts': (Post, _posts),
+    'comments': (Comment, _comments),
+    'follows': (Follow, _follows),
+}
+
+
+def insert_chunk(plan, table, index, start, stop):
+    """Строит и записывает один кусок строк одной транзакцией."""
+    model, build = BUILDERS[table]
+    objects = build(plan, index, start, stop)
+    with explicit_dates(), transaction.atomic():
+        model.objects.bulk_create(objects)
+    return len(objects)
+
+
+def _insert_chunk(task):
+    return insert_chunk(*task)
+
+
+def _range(model, count):
+    first = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+    return first, first + count
+
+
+def _chunks(table, first, last, size=CHUNK_SIZE):
+    return [
+        (table, index, start, min(start + size, last))
+        for index, start in enumerate(range(first, last, size))
+    ]
+
+
+def seed(sizes, seed_value=1, processes=1, password=None, log=print):
+    """Добавляет в базу пользователей, группы, посты, комментарии и подписки.
+
+    Пользователи и группы пишутся в текущем процессе, остальное —
+    кусками по CHUNK_SIZE строк, на postgres в processes процессах.
+    """
+    generator = random.Random(f'{seed_value}:users')
+    users = _range(User, sizes['users'])
+    # Хэш пароля считается один раз и общий для всех пользователей
+    password = make_password(password) if password else '!'
+    with transaction.atomic():
+        User.objects.bulk_create(
+            User(
+                pk=pk,
+                username=f'seed{pk}',
+                first_name=generator.choice(WORDS).capitalize(),
+                password=password,
+            )
+            for pk in range(*users)
+        )
+        groups = _range(Group, sizes['groups'])
+        Group.objects.bulk_create(
+            Group(
+                pk=pk,
+                slug=f'seed-{pk}',
+                title=_text(generator, 1, 3)[:-1],
+                description=_text(generator, 5, 30),
+            )
+            for pk in range(*groups)
+        )
+    log(f'Пользователей: {sizes["users"]}, групп: {sizes["groups"]}')
+    now = timezone.now()
+    follows_per_user = sizes['follows'] / max(1, sizes['users'])
+    plan = {
+        'seed': seed_value,
+        'users': users,
+        'groups': groups,
+        'posts': _range(Post, sizes['posts']),
+        'follows_per_user': follows_per_user,
+        'images': placeholder_images(sizes['images']),
+        'start': now - HISTORY,
+        'end': now,
+    }
+    _run(plan, _chunks('posts', *plan['posts']), processes, log)
+    readers_per_chunk = max(1, int(CHUNK_SIZE / max(1, follows_per_user)))
+    done = _run(
+        plan,
+        _chunks('comments', *_range(Comment, sizes['comments']))
+        + _chunks('follows', *users, size=readers_per_chunk),
+        processes,
+        log
+    )
+    if done['follows'] < sizes['follows']:
+        # Читателей или авторов слишком мало для стольких разных пар
+        log(
+            f'Подписок меньше запрошенных: {done["follows"]} из '
+            f'{sizes["follows"]}, не хватило разных пар читатель — автор'
+        )
+    _reset_sequences()
+    return plan
+
+
+def _run(plan, chunks, processes, log):
+    tasks = [(plan, *chunk) for chunk in chunks]
+    # У sqlite один писатель, и процессы только ждали бы друг друга
+    if processes == 1 or connection.vendor == 'sqlite':
+        counts = [_insert_chunk(task) for task in tasks]
+    else:
+        # Дочерние процессы открывают свои соединения с базой
+        connections.close_all()
+        with Pool(processes, initializer=django.setup) as pool:
+            counts = pool.map(_insert_chunk, tasks)
+    done = Counter()
+    for task, count in zip(tasks, counts):
+        done[task[1]] += count
+    for table, count in done.items():
+        log(f'{table}: {count}')
+    return done
+
+
+def build_derived(images, skip=(), log=print):
+    """Строит то, что при обычной записи делают сигналы.
+
+    Счётчики пересчитываются всегда, ленты подписок ('timeline'),
+    поисковый индекс ('search') и миниатюры ('thumbnails') можно
+    пропустить и построить позже своими командами.
+    """
+    counters.recount()
+    counters.recount_images()
+    log('Счётчики пересчитаны')
+    if 'timeline' not in skip:
+        with transaction.atomic():
+            timeline.rebuild()
+        log('Ленты подписок построены')
+    if 'search' not in skip:
+        search.rebuild()
+        log('Поисковый индекс построен')
+    if 'thumbnails' not in skip:
+        for name in images:
+            post_id = Post.objects.filter(image=name).values_list(
+                'pk', flat=True
+            ).first()
+            if post_id is not None:
+                thumbnails.generate(post_id, name)
+        log('Миниатюры сгенерированы')
+
+
+def _reset_sequences():
+    # Строки записаны с явными id, и последовательности postgres
+    # надо продвинуть за них
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [User, Group, Post, Comment, Follow]
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -0,0 +1,232 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import counters, fragments, search, thumbnails, timeline
+from .models import (AuthorStats, Comment, Follow, Group, Post,
+                     SearchTerm)
+
+User = get_user_model()
+
+
+def _feeds_of(posts):
+    """Ленты, в которых показываются посты из выборки."""
+    pairs = posts.order_by().values_list('author_id', 'group_id').distinct()
+    return {
+        name
+        for author_id, group_id in pairs
+        for name in fragments.feed_names(author_id, group_id)
+    }
+
+
+# Поля автора и группы, которые выводятся в карточках постов
+CARD_USER_FIELDS = ('username', 'first_name', 'last_name')
+CARD_GROUP_FIELDS = ('title', 'slug')
+
+
+def _previous_card_fields(sender, instance, fields, update_fields):
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return None
+    return sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _card_fields_changed(instance, fields):
+    previous = getattr(instance, '_previous_card_fields', None)
+    current = tuple(getattr(instance, name) for name in fields)
+    return previous is not None and previous != current
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._previous_card_fields = _previous_card_fields(
+            sender, instance, CARD_USER_FIELDS, update_fields
+        )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+    elif update_fields is None or set(update_fields) != {'last_login'}:
+        # Вход на сайт меняет только last_login, карточки он не трогает
+        names = _feeds_of(instance.posts.all())
+        fragments.bump(f'author:{instance.pk}', *names)
+        if _card_fields_changed(instance, CARD_USER_FIELDS):
+            fragments.rerender_later(
+                instance.posts.values_list('pk', flat=True), names
+            )
+            # Имя автора есть и в закэшированных комментариях
+            fragments.bump(*(
+                f'comments:{post_id}' for post_id in instance.comments
+                .values_list('post_id', flat=True).distinct()
+            ))
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._previous_card_fields = _previous_card_fields(
+            sender, instance, CARD_GROUP_FIELDS, update_fields
+        )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_object(SearchTerm.GROUP, instance)
+    if not created:
+        names = _feeds_of(instance.posts.all())
+        fragments.bump(f'group:{instance.pk}', *names)
+        if _card_fields_changed(instance, CARD_GROUP_FIELDS):
+            fragments.rerender_later(
+                instance.posts.values_list('pk', flat=True), names
+            )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления у постов уже не узнать, что они были в группе
+    posts = instance.posts.all()
+    instance._post_ids = list(posts.values_list('pk', flat=True))
+    instance._feeds = _feeds_of(posts)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    search.remove_object(SearchTerm.GROUP, instance.pk)
+    fragments.rerender_later(
+        getattr(instance, '_post_ids', ()), getattr(instance, '_feeds', ())
+    )
+
+
+def _release_image(name):
+    # Файл без ссылок удаляется вместе с миниатюрами после коммита
+    if counters.release_image(name):
+        transaction.on_commit(lambda: thumbnails.delete_image(name))
+
+
+def _acquire_image(instance):
+    name = instance.image.name
+    storage = instance.image.storage
+    content = getattr(instance, '_image_content', None)
+    if (counters.acquire_image(name) and content is not None
+            and not storage.exists(name)):
+        # Последний прежний пост с этим файлом удалили, пока загрузка
+        # считала файл уже записанным: пишем его заново
+        content.seek(0)
+        storage.save_derived(name, content)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Загрузку держим до post_save: хранилище могло не записать файл,
+    # решив, что такое содержимое уже лежит на диске
+    instance._image_content = None
+    if instance.image and not instance.image._committed:
+        instance._image_content = instance.image.file
+    # Запоминаем прежние группу и картинку, чтобы перенести счётчики
+    # при правке
+    if instance.pk is not None:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image').first() or (None, '')
+        )
+        # Варианты прежней картинки новой не подходят
+        if instance._previous_image != instance.image.name:
+            instance.image_variants = ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_object(SearchTerm.POST, instance)
+    fragments.store_cards([instance])
+    if created:
+        _acquire_image(instance)
+        counters.bump_user(instance.author_id, 'post_count', 1)
+        counters.bump_group(instance.group_id, 1)
+        timeline.fan_out_post(instance)
+        fragments.bump(
+            *fragments.feed_names(instance.author_id, instance.group_id),
+            f'author:{instance.author_id}'
+        )
+        return
+    # Ленты API отдают текст постов, поэтому правка меняет и их
+    names = fragments.feed_names(instance.author_id, instance.group_id)
+    names.append(f'post:{instance.pk}')
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.bump_group(previous_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+        if previous_group_id is not None:
+            names.append(f'feed:group:{previous_group_id}')
+    previous_image = getattr(instance, '_previous_image', '')
+    if previous_image != instance.image.name:
+        _acquire_image(instance)
+        _release_image(previous_image)
+    fragments.bump(*names)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.remove_object(SearchTerm.POST, instance.pk)
+    _release_image(instance.image.name)
+    counters.bump_user(instance.author_id, 'post_count', -1)
+    counters.bump_group(instance.group_id, -1)
+    fragments.bump(
+        *fragments.feed_names(instance.author_id, instance.group_id),
+        f'author:{instance.author_id}',
+        f'post:{instance.pk}',
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_object(SearchTerm.COMMENT, instance)
+    if created:
+        counters.bump_post(instance.post_id, 1)
+        fragments.bump(f'comments:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    search.remove_object(SearchTerm.COMMENT, instance.pk)
+    counters.bump_post(instance.post_id, -1)
+    fragments.bump(f'comments:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, 'follower_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        timeline.add_author(instance.user_id, instance.author_id)
+        fragments.bump(
+            f'feed:follow:{instance.user_id}',
+            f'stats:{instance.user_id}',
+            f'stats:{instance.author_id}',
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'follower_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    fragments.bump(
+        f'feed:follow:{instance.user_id}',
+        f'stats:{instance.user_id}',
+        f'stats:{instance.author_id}',
+    )
@@ -0,0 +1,105 @@
+"""Стеммер для русского языка по алгоритму Snowball (Портера)."""
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND_1 = ('в', 'вши', 'вшись')
+PERFECTIVE_GERUND_2 = ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+REFLEXIVE = ('ся', 'сь')
+VERB_1 = (
+    'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+    'ют', 'ны', 'ть', 'ешь', 'нно',
+)
+VERB_2 = (
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+    'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+    'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом',
+    'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейш', 'ейше')
+DERIVATIONAL = ('ост', 'ость')
+
+
+def _regions(word):
+    """Начала областей RV, R1 и R2 из описания алгоритма."""
+    rv = r1 = r2 = len(word)
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r1, r2
+
+
+def _remove(word, start, endings, after_a=()):
+    """Отрезает самое длинное окончание из области, начинающейся в start.
+
+    Окончания из after_a отрезаются, только если перед ними стоит
+    «а» или «я» из той же области. Возвращает None, если отрезать нечего.
+    """
+    region = word[start:]
+    matches = [
+        ending for ending in endings + after_a if region.endswith(ending)
+    ]
+    if not matches:
+        return None
+    ending = max(matches, key=len)
+    stem = word[:-len(ending)]
+    if ending not in endings and (
+        len(stem) <= start or stem[-1] not in 'ая'
+    ):
+        return None
+    return stem
+
+
+# Словарь текстов невелик, а слова повторяются: при построении индекса
+# каждое слово разбирается один раз
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, _, r2 = _regions(word)
+    stemmed = _remove(word, rv, PERFECTIVE_GERUND_2, PERFECTIVE_GERUND_1)
+    if stemmed is not None:
+        word = stemmed
+    else:
+        word = _remove(word, rv, REFLEXIVE) or word
+        stemmed = _remove(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            word = _remove(stemmed, rv, PARTICIPLE_2, PARTICIPLE_1) or stemmed
+        else:
+            word = (
+                _remove(word, rv, VERB_2, VERB_1)
+                or _remove(word, rv, NOUN)
+                or word
+            )
+    if word[rv:].endswith('и'):
+        word = word[:-1]
+    word = _remove(word, r2, DERIVATIONAL) or word
+    if word[rv:].endswith('нн'):
+        return word[:-1]
+    stemmed = _remove(word, rv, SUPERLATIVE)
+    if stemmed is not None:
+        word = stemmed
+        if word[rv:].endswith('нн'):
+            word = word[:-1]
+    elif word[rv:].endswith('ь'):
+        word = word[:-1]
+    return word
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит каждое уникальное содержимое один раз.
+
+    Имя файла — SHA-256 содержимого, разложенный по подкаталогам
+    из первых символов хэша: posts/3f/a2/3fa2….jpg. Повторная загрузка
+    той же картинки получает то же имя и не пишет ничего на диск.
+    Сколько постов ссылается на файл, считают счётчики ImageBlob.
+    """
+
+    def content_hash(self, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def hashed_name(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        digest = self.content_hash(content)
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    def save_derived(self, name, content):
+        """Пишет производный файл, например вариант картинки, под своим именем.
+
+        Имя выводится из хэша исходника, так что оно тоже однозначно
+        задаёт содержимое.
+        """
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        # Файл пишется рядом под временным именем и переименовывается:
+        # две одновременные загрузки одной картинки не видят половину
+        # файла, а перезапись не страшна, ведь содержимое то же
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return name
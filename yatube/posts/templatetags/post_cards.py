@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.fragments import render_body, render_card
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    # Готовый HTML из поста, шаблон карточки здесь не рендерится
+    return mark_safe(render_card(post))
+
+
+@register.simple_tag
+def post_body(post):
+    return mark_safe(render_body(post))
@@ -0,0 +1,50 @@
+from django import template
+
+from posts import variants
+
+register = template.Library()
+
+# Картинка занимает всю колонку до её наибольшей ширины
+SIZES = '(max-width: 960px) 100vw, 960px'
+FALLBACK_TYPE = 'image/jpeg'
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post):
+    """<picture> из готовых вариантов картинки поста.
+
+    Адреса берутся из хранилища, миниатюры здесь не ищутся и не
+    строятся. Пока варианты не готовы, показывается исходная картинка.
+    """
+    if not post.image:
+        return {}
+    described = variants.load(post)
+    if described is None:
+        return {'src': post.image.url}
+    storage = post.image.storage
+    sources = []
+    for mime_type, files in described['sources'].items():
+        sources.append({
+            'type': mime_type,
+            'srcset': ', '.join(
+                f'{storage.url(name)} {width}w' for name, width in files
+            ),
+            'src': next(
+                storage.url(name) for name, width in files
+                if width == described['width']
+            ),
+        })
+    # Старые браузеры берут JPEG из самого <img>
+    fallback = next(
+        (source for source in sources if source['type'] == FALLBACK_TYPE),
+        sources[-1]
+    )
+    sources.remove(fallback)
+    return {
+        'sources': sources,
+        'src': fallback['src'],
+        'srcset': fallback['srcset'],
+        'sizes': SIZES,
+        'width': described['width'],
+        'height': described['height'],
+    }
@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from .. import benchmark
+from ..models import Follow, Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SIZES = {
+    'users': 20,
+    'groups': 3,
+    'posts': 120,
+    'comments': 30,
+    'follows': 40,
+    'images': 2,
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_and_measure_every_route(self):
+        """Набор данных засевается, и каждый адрес отвечает без ошибок."""
+        benchmark.seed(SIZES, log=lambda message: None)
+        self.assertEqual(Post.objects.count(), SIZES['posts'])
+        self.assertEqual(Follow.objects.count(), SIZES['follows'])
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        for scenario in benchmark.scenarios():
+            with self.subTest(route=scenario[0]):
+                result = benchmark.measure(scenario, requests=2, warmup=1)
+                self.assertEqual(result['requests'], 2)
+                self.assertEqual(result['errors'], 0)
+        cost = benchmark.compression_cost(pages=2, repeat=1)
+        self.assertEqual(cost['pages'], 2)
+        self.assertLess(cost['codecs']['gzip:6']['ratio'], 0.5)
+
+    def test_regressions(self):
+        """Регрессией считается рост медианы сверх допуска."""
+        baseline = {'routes': {
+            'index': {'p50_ms': 10.0},
+            'profile': {'p50_ms': 10.0},
+        }}
+        results = {'routes': {
+            'index': {'p50_ms': 12.0},
+            'profile': {'p50_ms': 13.0},
+            'search': {'p50_ms': 100.0},
+        }}
+        self.assertEqual(
+            benchmark.regressions(results, baseline, 0.25),
+            [('profile', 10.0, 13.0)]
+        )
+
+    def test_percentile(self):
+        """Перцентиль берётся по ближайшему рангу."""
+        samples = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(samples, 0.5), 50)
+        self.assertEqual(benchmark.percentile(samples, 0.99), 99)
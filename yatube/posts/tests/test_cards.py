@@ -0,0 +1,123 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import fragments
+from ..models import Group, Post, User
+from .test_views import (DESCRIPTION, FIRST_TITLE, SECOND_TITLE, SLUG,
+                         TEXT_ONE, TEXT_TWO, USER_ONE)
+
+
+class StoredCardsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username=USER_ONE, first_name='Иван'
+        )
+        self.group = Group.objects.create(
+            title=FIRST_TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text=f'{TEXT_ONE}\nещё'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def stored(self):
+        return Post.objects.get(pk=self.post.pk)
+
+    def test_card_stored_on_write(self):
+        """Карточка и текст поста рендерятся при записи."""
+        post = self.stored()
+        self.assertIn(f'{TEXT_ONE}<br>ещё', post.body_html)
+        self.assertIn(post.body_html, post.card_html)
+        self.assertIn(fragments.COUNT_SLOT, post.card_html)
+        self.assertIn(FIRST_TITLE, post.card_html)
+
+    def test_feed_only_concatenates_cards(self):
+        """Лента не рендерит карточки, а число постов автора свежее."""
+        Post.objects.create(author=self.user, text=TEXT_TWO)
+        with mock.patch.object(fragments, '_render') as render:
+            response = self.client.get(reverse('posts:index'))
+        render.assert_not_called()
+        content = response.content.decode()
+        self.assertIn(TEXT_TWO, content)
+        self.assertEqual(content.count('Всего постов автора: 2'), 2)
+        self.assertNotIn(fragments.COUNT_SLOT, content)
+
+    def test_edit_rerenders_card(self):
+        """Правка поста перерисовывает его карточку и страницу."""
+        self.client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            data={'text': TEXT_TWO, 'group': self.group.pk},
+        )
+        self.assertIn(TEXT_TWO, self.stored().card_html)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertContains(response, TEXT_TWO)
+
+    def test_render_cards_command(self):
+        """Команда и лента дорисовывают карточки постов без них."""
+        Post.objects.update(card_html='', body_html='')
+        call_command('render_cards', stdout=StringIO())
+        self.assertIn(TEXT_ONE, self.stored().card_html)
+        Post.objects.update(card_html='', body_html='')
+        self.client.get(reverse('posts:index'))
+        self.assertIn(TEXT_ONE, self.stored().card_html)
+
+
+@override_settings(CARD_RENDER_WORKERS=0)
+class CardRerenderTests(TransactionTestCase):
+    """Карточки перерисовываются после коммита, поэтому без TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username=USER_ONE, first_name='Иван'
+        )
+        self.group = Group.objects.create(
+            title=FIRST_TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text=TEXT_ONE
+        )
+
+    def stored(self):
+        return Post.objects.get(pk=self.post.pk)
+
+    def test_author_and_group_changes_rerender_cards(self):
+        """Новое имя автора и название группы попадают в карточки."""
+        self.user.first_name = 'Пётр'
+        self.user.save()
+        self.assertIn('Пётр', self.stored().card_html)
+        self.group.title = SECOND_TITLE
+        self.group.save()
+        self.assertIn(SECOND_TITLE, self.stored().card_html)
+        self.group.delete()
+        self.assertNotIn(
+            reverse('posts:group_list', args=(SLUG,)), self.stored().card_html
+        )
+
+    def test_unrelated_changes_keep_cards(self):
+        """Поля, которых нет в карточке, перерисовки не вызывают."""
+        with mock.patch.object(fragments, '_render') as render:
+            self.group.description = 'Новое описание'
+            self.group.save()
+            self.user.email = 'user@example.com'
+            self.user.save()
+        render.assert_not_called()
+
+    def test_rerender_runs_after_commit(self):
+        """Переименование не перерисовывает карточки внутри транзакции."""
+        with transaction.atomic():
+            self.group.title = SECOND_TITLE
+            self.group.save()
+            self.assertNotIn(SECOND_TITLE, self.stored().card_html)
+        self.assertIn(SECOND_TITLE, self.stored().card_html)
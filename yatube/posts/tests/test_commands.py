@@ -0,0 +1,22 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Follow, Post, TimelineEntry, User
+from .test_views import TEXT_ONE, USER_ONE, USER_TWO
+
+
+class BackfillTimelineTests(TestCase):
+    def test_backfill_restores_timelines(self):
+        """backfill_timeline собирает ленты по существующим подпискам."""
+        user = User.objects.create_user(username=USER_ONE)
+        author = User.objects.create_user(username=USER_TWO)
+        Follow.objects.create(user=user, author=author)
+        post = Post.objects.create(author=author, text=TEXT_ONE)
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertEqual(
+            list(user.timeline.values_list('post_id', flat=True)),
+            [post.pk]
+        )
@@ -0,0 +1,136 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import comment_queue, search
+from ..models import Comment, Post, SearchTerm, User
+from .test_views import TEXT_ONE, USER_ONE, USER_TWO
+
+TEMP_QUEUE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+COMMENT = 'Отложенный комментарий'
+
+
+@override_settings(
+    COMMENT_WRITE_BEHIND=True,
+    COMMENT_QUEUE_LOCATION=os.path.join(TEMP_QUEUE_DIR, 'queue.sqlite3'),
+    COMMENT_QUEUE_FLUSH_INTERVAL=0,
+)
+class CommentQueueTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_QUEUE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        comment_queue._connection().execute('DELETE FROM comments')
+        self.user = User.objects.create_user(username=USER_ONE)
+        self.post = Post.objects.create(author=self.user, text=TEXT_ONE)
+        self.detail_url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            data={'text': COMMENT}
+        )
+
+    def test_comment_queued_and_visible_to_author(self):
+        """Комментарий ждёт в очереди, но автор видит его сразу."""
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(self.client.get(self.detail_url), COMMENT)
+        other_client = Client()
+        other_client.force_login(
+            User.objects.create_user(username=USER_TWO)
+        )
+        self.assertNotContains(other_client.get(self.detail_url), COMMENT)
+
+    def test_flush_saves_batch_with_side_effects(self):
+        """Перенос сохраняет комментарии, счётчики и поисковый индекс."""
+        call_command('flush_comments', stdout=StringIO())
+        comment = Comment.objects.get()
+        self.assertEqual(
+            (comment.post, comment.author, comment.text),
+            (self.post, self.user, COMMENT)
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertIn(
+            (SearchTerm.COMMENT, comment.pk),
+            [
+                (hit['kind'], hit['object_id'])
+                for hit in search.search('отложенный')
+            ]
+        )
+        self.assertEqual(comment_queue.pending(self.post.pk, self.user), [])
+        self.assertContains(self.client.get(self.detail_url), COMMENT, 1)
+
+    def test_comments_to_deleted_post_dropped(self):
+        """Комментарии к удалённому посту не ломают перенос."""
+        self.post.delete()
+        self.assertEqual(comment_queue.flush_all(), 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_flush_keeps_queued_time(self):
+        """Комментарий сохраняется со временем постановки в очередь."""
+        queued_at = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        comment_queue._connection().execute(
+            'UPDATE comments SET created = ?', (queued_at.timestamp(),)
+        )
+        comment_queue.flush_all()
+        self.assertEqual(Comment.objects.get().created, queued_at)
+
+    def test_redelivered_batch_not_duplicated(self):
+        """Пачку, сохранённую до падения воркера, повтор не дублирует."""
+        save = comment_queue._save
+
+        def save_and_crash(rows):
+            save(rows)
+            raise RuntimeError('Воркер упал до удаления строк из очереди')
+
+        with mock.patch.object(comment_queue, '_save', save_and_crash):
+            with self.assertRaises(RuntimeError):
+                comment_queue.flush()
+        self.assertEqual(comment_queue.flush_all(), 0)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(comment_queue.pending(self.post.pk, self.user), [])
+
+    def test_queue_not_locked_while_saving(self):
+        """Пока пачка пишется в базу, новые комментарии встают в очередь."""
+        save = comment_queue._save
+
+        def save_and_enqueue(rows):
+            connection = comment_queue._connection()
+            # Отдельное соединение не ждёт блокировку очереди
+            other = sqlite3.connect(
+                settings.COMMENT_QUEUE_LOCATION, timeout=0
+            )
+            other.execute(
+                'INSERT INTO comments (post_id, author_id, text, created) '
+                'VALUES (?, ?, ?, 0)', (self.post.pk, self.user.pk, 'Ещё')
+            )
+            other.commit()
+            other.close()
+            self.assertFalse(connection.in_transaction)
+            return save(rows)
+
+        with mock.patch.object(comment_queue, '_save', save_and_enqueue):
+            self.assertEqual(comment_queue.flush(), 1)
+        self.assertEqual(
+            [comment.text for comment in comment_queue.pending(
+                self.post.pk, self.user
+            )],
+            ['Ещё']
+        )
+        self.assertEqual(comment_queue.flush_all(), 1)
@@ -1,13 +1,18 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
-from ..models import Group, Post, User
+from .. import timeline
+from ..forms import PostForm
+from ..models import AuthorStats, Group, Post, User
 from .test_views import (DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE,
                          USER_TWO)
 
@@ -81,6 +86,78 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.author, self.user)
         self.assertEqual(post.group.id, form_data['group'])
 
+    def test_failed_create_rolls_back_counters(self):
+        """Сбой сигнала откатывает и пост, и счётчик постов автора."""
+        posts_count = Post.objects.count()
+        post_count = AuthorStats.objects.get(user=self.user).post_count
+        with mock.patch.object(
+            timeline, 'fan_out_post', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.authorized_client.post(
+                    reverse('posts:post_create'), data={'text': 'Новый пост'}
+                )
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).post_count, post_count
+        )
+
+    @override_settings(MAX_UPLOAD_IMAGE_SIZE=1024)
+    def test_oversized_image_rejected(self):
+        """Картинка больше лимита не сохраняется, форма сообщает ошибку."""
+        posts_count = Post.objects.count()
+        content = BytesIO()
+        Image.effect_noise((200, 200), 100).save(content, 'PNG')
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': TEXT_ONE,
+                'image': SimpleUploadedFile('big.png', content.getvalue()),
+            }
+        )
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Файл больше 1,0\xa0КБ, загрузите картинку поменьше.'
+        )
+
+    def test_truncated_image_rejected(self):
+        """Обрезанный файл картинки не роняет форму, а даёт ошибку."""
+        content = BytesIO()
+        Image.effect_noise((400, 400), 100).convert('RGB').save(
+            content, 'JPEG'
+        )
+        truncated = content.getvalue()[:len(content.getvalue()) // 2]
+        form = PostForm(
+            data={'text': TEXT_ONE},
+            files={'image': SimpleUploadedFile(
+                'broken.jpg', truncated, 'image/jpeg'
+            )},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'invalid_image')
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_image_downscaled_without_metadata(self):
+        """Картинка уменьшается до лимита и теряет EXIF."""
+        content = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        Image.new('RGB', (400, 200)).save(content, 'JPEG', exif=exif)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с фото',
+                'image': SimpleUploadedFile('photo.jpeg', content.getvalue()),
+            }
+        )
+        post = Post.objects.get(text='Пост с фото')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertNotIn('exif', image.info)
+        self.assertTrue(post.image.name.endswith('.jpg'))
+
     def test_guest_client_create_post(self):
         """Создание записи возможно только авторизованному пользователю"""
         posts_count = Post.objects.count()
@@ -1,7 +1,12 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import NUM_OF_WORDS, Group, Post, User
-from .test_views import DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE
+from ..models import (NUM_OF_WORDS, AuthorStats, Comment, Follow, Group, Post,
+                      User)
+from .test_views import (DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE,
+                         USER_TWO)
 
 
 class PostModelTest(TestCase):
@@ -55,3 +60,68 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     group._meta.get_field(field).verbose_name, expected_value)
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username=USER_ONE)
+        self.reader = User.objects.create_user(username=USER_TWO)
+        self.group = Group.objects.create(
+            title=FIRST_TITLE,
+            slug=SLUG,
+            description=DESCRIPTION,
+        )
+
+    def test_counters_follow_saves_and_deletes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text=TEXT_ONE
+        )
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text=TEXT_ONE
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).post_count, 1
+        )
+        self.assertEqual(self.group.post_count, 1)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).follower_count, 1
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
+        comment.delete()
+        follow.delete()
+        post.delete()
+        stats = AuthorStats.objects.get(user=self.user)
+        self.group.refresh_from_db()
+        self.assertEqual(
+            (stats.post_count, stats.follower_count, self.group.post_count),
+            (0, 0, 0)
+        )
+
+    def test_group_change_moves_post_count(self):
+        """При смене группы пост переносится в счётчик новой группы."""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text=TEXT_ONE
+        )
+        post.group = None
+        post.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики."""
+        Post.objects.create(author=self.user, group=self.group, text=TEXT_ONE)
+        AuthorStats.objects.update(post_count=42)
+        Group.objects.update(post_count=42)
+        call_command('recount', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).post_count, 1
+        )
+        self.assertEqual(self.group.post_count, 1)
@@ -0,0 +1,106 @@
+import gzip
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import compression
+
+from .. import pagecache
+from ..models import Post, User
+from .test_views import TEXT_ONE, TEXT_TWO, USER_ONE
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username=USER_ONE)
+        self.post = Post.objects.create(author=self.user, text=TEXT_ONE)
+        self.guest_client = Client()
+        self.url = reverse('posts:index')
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторный анонимный запрос не вызывает view и базу."""
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertIsNone(response.context)
+        self.assertContains(response, TEXT_ONE)
+
+    def test_change_purges_page_and_stale_served_while_rendering(self):
+        """Новый пост устаревает страницу, пока её рисуют, отдаётся старая."""
+        self.guest_client.get(self.url)
+        Post.objects.create(author=self.user, text=TEXT_TWO)
+        cache.add(f'{pagecache.page_key(self.url, {})}:lock', 1)
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertNotContains(response, TEXT_TWO)
+        cache.delete(f'{pagecache.page_key(self.url, {})}:lock')
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, TEXT_TWO)
+
+    def test_miss_keeps_lock_of_other_request(self):
+        """Запрос, не бравший блокировку, не снимает чужую."""
+        lock = f'{pagecache.page_key(self.url, {})}:lock'
+        cache.add(lock, 'other')
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertEqual(cache.get(lock), 'other')
+
+    def test_query_normalised_and_unknown_params_skipped(self):
+        """Порядок параметров не плодит копий, чужие не кэшируются."""
+        self.guest_client.get(self.url, {'page': 1, 'cursor': ''})
+        response = self.guest_client.get(f'{self.url}?cursor=&page=1')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        for _ in range(2):
+            response = self.guest_client.get(self.url, {'utm': 'x'})
+            self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertIsNone(pagecache.page_key(self.url, {'utm': 'x'}))
+
+    def test_hit_served_precompressed(self):
+        """Попадание отдаёт сжатую при записи копию, не сжимая заново."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'{TEXT_TWO} {i}') for i in range(9)
+        )
+        self.guest_client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch.object(
+            compression, 'compress', wraps=compression.compress
+        ) as compress:
+            response = self.guest_client.get(
+                self.url, HTTP_ACCEPT_ENCODING='gzip'
+            )
+        compress.assert_not_called()
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(TEXT_ONE, gzip.decompress(response.content).decode())
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_logged_in_pages_not_cached(self):
+        """Страницы вошедших пользователей в кэш не попадают."""
+        client = Client()
+        client.force_login(self.user)
+        client.get(self.url)
+        response = client.get(self.url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertIsNotNone(response.context)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics(self):
+        """Счётчики попаданий отдаются вместе с остальными метриками."""
+        self.guest_client.get(self.url)
+        self.guest_client.get(self.url)
+        response = self.guest_client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertContains(response, 'yatube_page_cache_hit 1\n')
+        self.assertContains(response, 'yatube_page_cache_miss 1\n')
+        self.assertContains(response, 'yatube_page_cache_hit_ratio 0.5\n')
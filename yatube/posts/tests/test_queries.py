@@ -0,0 +1,114 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..views import num_of_pub
+from .test_views import DESCRIPTION, FIRST_TITLE, SLUG, TEXT_ONE, USER_ONE
+
+AUTHORS = 5
+POSTS_PER_AUTHOR = 4
+# Бюджет не зависит от числа постов на странице: сессия, пользователь,
+# выборка страницы и не больше пары запросов на саму страницу. Группа,
+# автор и пост сначала ищутся по ключу, чтобы посчитать ETag
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    # Авторы группы для ETag, с холодным кэшем
+    'posts:group_list': 6,
+    'posts:profile': 6,
+    # Список подписок для ключа ленты, с холодным кэшем
+    'posts:follow_index': 4,
+    'posts:post_detail': 5,
+}
+# Полный проход по таблице или сортировка во временном B-дереве
+SLOW_PLAN = re.compile(r'^SCAN (TABLE )?\S+$|TEMP B-TREE')
+
+
+class FeedQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username=USER_ONE)
+        cls.group = Group.objects.create(
+            title=FIRST_TITLE,
+            slug=SLUG,
+            description=DESCRIPTION,
+        )
+        cls.post_ids = []
+        for number in range(AUTHORS):
+            author = User.objects.create_user(username=f'author_{number}')
+            Follow.objects.create(user=cls.reader, author=author)
+            for _ in range(POSTS_PER_AUTHOR):
+                cls.post = Post.objects.create(
+                    author=author,
+                    group=cls.group,
+                    text=TEXT_ONE,
+                )
+                cls.post_ids.append(cls.post.pk)
+                Comment.objects.create(
+                    post=cls.post,
+                    author=cls.reader,
+                    text=TEXT_ONE,
+                )
+        cls.author = author
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed_urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse('posts:group_list', args=(SLUG,)),
+            'posts:profile': reverse(
+                'posts:profile', args=(self.author.username,)
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=(self.post.pk,)
+            ),
+        }
+
+    def test_feed_pages_fit_query_budget(self):
+        """Страницы лент укладываются в фиксированный бюджет запросов."""
+        for name, url in self.feed_urls().items():
+            with self.subTest(name=name):
+                with self.assertNumQueries(QUERY_BUDGETS[name]):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_feed_page_is_full(self):
+        """Бюджет проверяется на полной странице новейших постов."""
+        newest = self.post_ids[::-1][:num_of_pub]
+        urls = self.feed_urls()
+        for name in ('posts:index', 'posts:group_list', 'posts:follow_index'):
+            with self.subTest(name=name):
+                response = self.authorized_client.get(urls[name])
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    newest
+                )
+
+    def test_feed_queries_use_indexes(self):
+        """Каждый запрос страниц лент читает таблицы по индексу."""
+        urls = list(self.feed_urls().values())
+        urls.append(reverse('posts:index') + '?page=2')
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plan = [row[-1] for row in cursor.fetchall()]
+                with self.subTest(url=url, sql=query['sql']):
+                    self.assertFalse(
+                        [step for step in plan if SLOW_PLAN.search(step)],
+                        plan
+                    )
@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Group, Post, SearchTerm, User
+from .test_views import USER_ONE
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username=USER_ONE)
+        self.group = Group.objects.create(
+            title='Кошки', slug='cats', description='Про кошек'
+        )
+        self.cats = Post.objects.create(
+            author=self.user, text='Кошка спит весь день'
+        )
+        self.dogs = Post.objects.create(
+            author=self.user, text='Собака спала на диване'
+        )
+        self.comment = Comment.objects.create(
+            post=self.dogs, author=self.user, text='А моя кошка не спит'
+        )
+
+    def found(self, query):
+        return [
+            (hit['kind'], hit['object_id'])
+            for hit in search.search(query)
+        ]
+
+    def test_word_forms_match(self):
+        """Разные формы слова находят один и тот же документ."""
+        self.assertEqual(
+            self.found('собаками спали'), [(SearchTerm.POST, self.dogs.pk)]
+        )
+
+    def test_all_terms_required_and_ranked(self):
+        """Находятся только документы со всеми словами, лучшие выше."""
+        self.assertEqual(
+            self.found('кошками'),
+            [
+                (SearchTerm.GROUP, self.group.pk),
+                (SearchTerm.POST, self.cats.pk),
+                (SearchTerm.COMMENT, self.comment.pk),
+            ]
+        )
+        self.assertEqual(
+            self.found('кошка спит'),
+            [
+                (SearchTerm.POST, self.cats.pk),
+                (SearchTerm.COMMENT, self.comment.pk),
+            ]
+        )
+        self.assertEqual(self.found('и не'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Правка и удаление документа сразу видны в поиске."""
+        self.cats.text = 'Про попугаев'
+        self.cats.save()
+        self.assertNotIn((SearchTerm.POST, self.cats.pk), self.found('кошка'))
+        self.assertIn((SearchTerm.POST, self.cats.pk), self.found('попугай'))
+        self.comment.delete()
+        self.assertNotIn(
+            (SearchTerm.COMMENT, self.comment.pk), self.found('кошка')
+        )
+
+    def test_rebuild_command(self):
+        """rebuild_search_index восстанавливает потерянный индекс."""
+        expected = self.found('кошка')
+        SearchTerm.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('кошка'), expected)
+
+    def test_search_page(self):
+        """Страница поиска показывает посты, комментарии и группы."""
+        response = self.client.get(reverse('posts:search'), {'q': 'кошки'})
+        hits = response.context['page_obj'].object_list
+        self.assertEqual(
+            [hit['object'] for hit in hits],
+            [self.group, self.cats, self.comment]
+        )
+        self.assertTrue(hits[1]['object'].card_html)
@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from .. import seeding
+from ..models import AuthorStats, Comment, Follow, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class SeedYatubeTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_yatube(self):
+        """Команда пишет все таблицы и строит счётчики и ленты."""
+        call_command(
+            'seed_yatube', '--users', '30', '--groups', '3', '--posts', '200',
+            '--comments', '50', '--follows', '60', '--images', '2',
+            '--password', 'seed-password', '--skip', 'search',
+            stdout=StringIO()
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertFalse(Follow.objects.filter(
+            user=F('author')
+        ).exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('post_count', flat=True)),
+            200
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(self.client.login(
+            username=User.objects.first().username, password='seed-password'
+        ))
+
+    def test_posts_dated_in_id_order(self):
+        """Даты постов растянуты по истории и растут вместе с id."""
+        seeding.seed(
+            {'users': 5, 'groups': 0, 'posts': 50, 'comments': 0,
+             'follows': 0, 'images': 0},
+            log=lambda message: None,
+        )
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True
+        ))
+        self.assertEqual(dates, sorted(dates))
+        self.assertGreater(dates[-1] - dates[0], seeding.HISTORY / 2)
+
+    def test_chunks_are_deterministic(self):
+        """Кусок строк зависит только от seed и своего номера."""
+        plan = {
+            'seed': 7, 'users': (1, 10), 'groups': (1, 1),
+            'posts': (1, 100), 'follows_per_user': 2, 'images': [],
+            'start': seeding.timezone.now() - seeding.HISTORY,
+            'end': seeding.timezone.now(),
+        }
+        first = seeding._posts(plan, 3, 30, 40)
+        second = seeding._posts(plan, 3, 30, 40)
+        self.assertEqual(
+            [(post.author_id, post.text) for post in first],
+            [(post.author_id, post.text) for post in second]
+        )
+        self.assertNotEqual(
+            [post.text for post in first],
+            [post.text for post in seeding._posts(plan, 4, 30, 40)]
+        )
+
+    def test_comments_written_after_their_post(self):
+        """Комментарий датирован между своим постом и концом истории."""
+        plan = seeding.seed(
+            {'users': 5, 'groups': 0, 'posts': 30, 'comments': 100,
+             'follows': 0, 'images': 0},
+            log=lambda message: None,
+        )
+        for created, pub_date in Comment.objects.values_list(
+            'created', 'post__pub_date'
+        ):
+            self.assertLessEqual(pub_date, created)
+            self.assertLessEqual(created, plan['end'])
+
+    def test_follow_shortfall_reported(self):
+        """Если разных пар не хватает, команда сообщает, сколько вышло."""
+        messages = []
+        seeding.seed(
+            {'users': 3, 'groups': 0, 'posts': 0, 'comments': 0,
+             'follows': 50, 'images': 0},
+            log=messages.append,
+        )
+        self.assertLess(Follow.objects.count(), 50)
+        self.assertIn(
+            f'Подписок меньше запрошенных: {Follow.objects.count()} из 50',
+            '\n'.join(messages)
+        )
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+
+from .. import counters, thumbnails, variants
+from ..models import ImageBlob, Post, User
+from .test_thumbnails import SMALL_GIF
+from .test_views import TEXT_ONE, TEXT_TWO, USER_ONE
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def stored_files():
+    return [
+        os.path.relpath(os.path.join(root, name), TEMP_MEDIA_ROOT)
+        for root, _, names in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        for name in names
+    ]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username=USER_ONE)
+
+    def tearDown(self):
+        # kvstore миниатюр держит ключи и в кэше, а не только в базе
+        cache.clear()
+
+    def create_post(self, text, file_name):
+        post = Post.objects.create(
+            author=self.user,
+            text=text,
+            image=SimpleUploadedFile(file_name, SMALL_GIF, 'image/gif'),
+        )
+        thumbnails.schedule(post)
+        return post
+
+    def test_duplicate_upload_stored_once(self):
+        """Одинаковое содержимое лежит в одном файле под путём из хэша."""
+        first = self.create_post(TEXT_ONE, 'small.gif')
+        second = self.create_post(TEXT_TWO, 'copy.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
+        self.assertEqual(stored_files(), [first.image.name])
+        self.assertEqual(
+            ImageBlob.objects.get(name=first.image.name).ref_count, 2
+        )
+
+    def test_duplicate_upload_skips_thumbnails(self):
+        """Миниатюры повторной картинки не генерируются заново."""
+        self.create_post(TEXT_ONE, 'small.gif')
+        with mock.patch.object(thumbnails, '_submit') as submit:
+            self.create_post(TEXT_TWO, 'copy.gif')
+        submit.assert_not_called()
+
+    def test_last_reference_deletes_file_and_thumbnails(self):
+        """Файл и миниатюры удаляются вместе с последним постом."""
+        first = self.create_post(TEXT_ONE, 'small.gif')
+        second = self.create_post(TEXT_TWO, 'copy.gif')
+        name = first.image.name
+        self.assertTrue(variants.load(Post.objects.get(pk=second.pk)))
+        first.delete()
+        self.assertTrue(first.image.storage.exists(name))
+        second.image = ''
+        second.save()
+        self.assertFalse(first.image.storage.exists(name))
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertEqual(stored_files(), [])
+
+    def test_reference_taken_before_delete_keeps_file(self):
+        """Ссылка, взятая до удаления файла, отменяет удаление."""
+        name = self.create_post(TEXT_ONE, 'small.gif').image.name
+        self.assertTrue(counters.release_image(name))
+        counters.acquire_image(name)
+        thumbnails.delete_image(name)
+        self.assertEqual(stored_files(), [name])
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+
+    def test_upload_racing_with_last_release_rewrites_file(self):
+        """Файл, удалённый между записью загрузки и ссылкой, пишется заново."""
+        first = self.create_post(TEXT_ONE, 'small.gif')
+        acquire_image = counters.acquire_image
+
+        def release_then_acquire(name):
+            # Загрузка уже пропустила запись: такой файл был на диске
+            first.delete()
+            self.assertEqual(stored_files(), [])
+            return acquire_image(name)
+
+        with mock.patch.object(
+            counters, 'acquire_image', release_then_acquire
+        ):
+            second = self.create_post(TEXT_TWO, 'copy.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(stored_files(), [second.image.name])
+        with second.image.open() as image:
+            self.assertEqual(image.read(), SMALL_GIF)
+        self.assertEqual(
+            ImageBlob.objects.get(name=second.image.name).ref_count, 1
+        )
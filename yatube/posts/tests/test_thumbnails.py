@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from sorl.thumbnail.models import KVStore
+
+from .. import thumbnails, variants
+from ..models import Post, User
+from .test_views import TEXT_ONE, USER_ONE
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Одинаковая картинка из других тестов хранится под тем же
+        # именем, и её миниатюры остаются в кэше kvstore
+        cache.clear()
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username=USER_ONE),
+            text=TEXT_ONE,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_generate_builds_variants_without_sorl(self):
+        """Генерация пишет варианты, а не миниатюры sorl."""
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertTrue(variants.load(self.post))
+        self.assertFalse(
+            KVStore.objects.filter(key__contains='||thumbnails||').exists()
+        )
+
+    def test_schedule_copies_existing_variants(self):
+        """Готовые варианты той же картинки переносятся без генерации."""
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        copy = Post.objects.create(
+            author=self.post.author, text=TEXT_ONE, image=self.post.image.name
+        )
+        with mock.patch.object(thumbnails, '_submit') as submit:
+            thumbnails.schedule(copy)
+        submit.assert_not_called()
+        self.assertTrue(variants.load(copy))
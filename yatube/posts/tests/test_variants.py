@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails, variants
+from ..models import Post, User
+from .test_views import TEXT_ONE, TEXT_TWO, USER_ONE
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(size, color=(200, 30, 30)):
+    content = BytesIO()
+    Image.new('RGB', size, color).save(content, 'JPEG')
+    return SimpleUploadedFile('photo.jpg', content.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ImageVariantsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username=USER_ONE)
+
+    def create_post(self, text=TEXT_ONE, size=(1600, 1000)):
+        return Post.objects.create(
+            author=self.user, text=text, image=jpeg(size)
+        )
+
+    def test_build_writes_widths_up_to_source(self):
+        """Варианты строятся в кадре карточки и не шире исходника."""
+        post = self.create_post(size=(700, 500))
+        described = variants.build(post.image.name)
+        jpeg_files = described['sources']['image/jpeg']
+        self.assertEqual([width for _, width in jpeg_files], [320, 640])
+        self.assertEqual(
+            (described['width'], described['height']), (640, 226)
+        )
+        storage = post.image.storage
+        for name, width in jpeg_files:
+            self.assertTrue(name.startswith(variants.VARIANTS_DIR + '/'))
+            with storage.open(name) as variant, Image.open(variant) as image:
+                self.assertEqual(image.width, width)
+        self.assertEqual(
+            list(described['sources']),
+            [mime_type for _, mime_type, _, _ in variants.available_formats()]
+        )
+
+    def test_duplicate_image_shares_variants(self):
+        """Пост с той же картинкой сразу получает готовые варианты."""
+        first = self.create_post()
+        thumbnails.generate(first.pk, first.image.name)
+        second = self.create_post(TEXT_TWO)
+        thumbnails.schedule(second)
+        second.refresh_from_db()
+        self.assertTrue(second.image_variants)
+        self.assertEqual(second.image_variants, Post.objects.get(
+            pk=first.pk
+        ).image_variants)
+
+    def test_new_image_drops_variants(self):
+        """Правка картинки сбрасывает варианты прежней."""
+        post = self.create_post()
+        thumbnails.generate(post.pk, post.image.name)
+        post.refresh_from_db()
+        post.image = jpeg((800, 600), color=(10, 10, 200))
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+
+    def test_delete_removes_variants(self):
+        """Удаление картинки удаляет и её варианты."""
+        post = self.create_post()
+        described = variants.build(post.image.name)
+        variants.delete(post.image.name)
+        for files in described['sources'].values():
+            for name, _ in files:
+                self.assertFalse(post.image.storage.exists(name))
+
+    def test_picture_markup(self):
+        """Страница поста отдаёт <picture> со srcset и размерами."""
+        post = self.create_post()
+        thumbnails.generate(post.pk, post.image.name)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        content = response.content.decode()
+        storage = post.image.storage
+        described = variants.load(Post.objects.get(pk=post.pk))
+        self.assertIn('<picture>', content)
+        self.assertIn('width="960" height="339"', content)
+        self.assertIn('loading="lazy"', content)
+        for name, width in described['sources']['image/jpeg']:
+            self.assertIn(f'{storage.url(name)} {width}w', content)
+
+    def test_markup_before_variants(self):
+        """Пока вариантов нет, показывается исходная картинка."""
+        post = self.create_post()
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertNotIn('<picture>', response.content.decode())
+        self.assertIn(
+            f'src="{post.image.url}"', response.content.decode()
+        )
+        self.assertEqual(Post.objects.get(pk=post.pk).image_variants, '')
@@ -1,15 +1,26 @@
+import base64
+import json
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from core.paginators import CursorPaginator
+
+from .. import fragments
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..comments import num_of_comments
 from ..views import num_of_pub
 
 User = get_user_model()
@@ -200,24 +211,174 @@ class PostViewsTests(TestCase):
             POSTS_OF_SECOND_AUTHOR
         )
 
+    def test_cursor_pages_walk_feed_forward_and_back(self):
+        """Курсоры ведут на следующую и обратно на первую страницу."""
+        first_page = self.client.get(reverse('posts:index')).context[
+            'page_obj'
+        ]
+        self.assertEqual(len(first_page), num_of_pub)
+        self.assertIsNone(first_page.previous_cursor)
+        second_page = self.client.get(
+            reverse('posts:index') + f'?cursor={first_page.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(len(second_page), POSTS_PAGINATOR_SECOND_PAGE)
+        self.assertIsNone(second_page.next_cursor)
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            list(Post.objects.order_by('-pub_date', '-id'))
+        )
+        back_page = self.client.get(
+            reverse('posts:index') + f'?cursor={second_page.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertIsNone(back_page.previous_cursor)
+
+    def test_cursor_page_uses_single_query(self):
+        """Страница по курсору не считает COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), num_of_pub)
+        cursor = paginator.get_cursor_page().next_cursor
+        with self.assertNumQueries(1):
+            paginator.get_cursor_page(cursor)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор отдаёт первую страницу."""
+        response = self.client.get(reverse('posts:index') + '?cursor=xyz')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.order_by('-pub_date', '-id')[:num_of_pub])
+        )
+
+    def test_cursor_cache_keyed_by_decoded_cursor(self):
+        """Разные записи одного курсора и мусор не плодят записей в кэше."""
+        paginator = CursorPaginator(Post.objects.all(), num_of_pub)
+        cursor = paginator.get_cursor_page().next_cursor
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        respelled = base64.urlsafe_b64encode(json.dumps(
+            {'x': 1, 'r': payload['r'], 'k': payload['k']}
+        ).encode()).decode()
+        cache.clear()
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            for raw in (cursor, respelled, 'xyz', 'abc', ''):
+                fragments.cursor_page(paginator, raw, 'feed:index')
+        pages = [
+            call for call in cache_set.call_args_list
+            if call[0][0].startswith('page:')
+        ]
+        self.assertEqual(len(pages), 2)
+        for call in pages:
+            self.assertEqual(call[0][2], fragments.CURSOR_PAGE_TIMEOUT)
+
     def test_index_page_cache(self):
         """Тест cache на странице index."""
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text=TEXT_TWO,
-            author=self.user,
-        )
+        # update() обходит сигналы, поэтому версии кэша не меняются
+        Post.objects.filter(pk=self.post.pk).update(text=TEXT_ONE)
         response_cache_one = self.authorized_client.get(reverse('posts:index'))
         posts_with_cache = response_cache_one.content
         self.assertEqual(posts_with_cache, posts)
         cache.clear()
+        # Карточка хранится в самом посте и обновляется перерисовкой
+        call_command('render_cards', stdout=StringIO())
         response_without_cache = self.authorized_client.get(
             reverse('posts:index')
         )
         new_posts = response_without_cache.content
         self.assertNotEqual(posts_with_cache, new_posts)
 
+    def test_writes_invalidate_cached_pages(self):
+        """Новый пост, правка и комментарий сразу видны на страницах."""
+        self.authorized_client.get(reverse('posts:index'))
+        self.authorized_client.post(
+            reverse('posts:post_create'), data={'text': 'Свежий пост'}
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+        new_post = Post.objects.get(text='Свежий пост')
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(new_post.pk,)),
+            data={'text': 'Исправленный пост'}
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исправленный пост')
+        detail_url = reverse('posts:post_detail', args=(new_post.pk,))
+        self.authorized_client.get(detail_url)
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(new_post.pk,)),
+            data={'text': 'Свежий комментарий'}
+        )
+        self.assertContains(
+            self.authorized_client.get(detail_url), 'Свежий комментарий'
+        )
+
+    def test_group_page_shows_fresh_author_post_count(self):
+        """Пост автора вне группы меняет его счётчик и на странице группы."""
+        guest_client = Client()
+        url = reverse('posts:group_list', args=(SLUG,))
+        etag = guest_client.get(url)['ETag']
+        Post.objects.create(text=TEXT_TWO, author=self.user)
+        response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response,
+            f'Всего постов автора: {self.user.posts.count()}'
+        )
+
+    def test_pages_answer_not_modified(self):
+        """Страницы с тем же ETag отдают 304, запись меняет ETag."""
+        guest_client = Client()
+        # Кроме главной, нужен один поиск по ключу для имён в ETag
+        urls = {
+            reverse('posts:index'): 0,
+            reverse('posts:group_list', args=(SLUG,)): 1,
+            reverse('posts:profile', args=(USER_ONE,)): 1,
+            reverse('posts:post_detail', args=(self.post.pk,)): 1,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                response = guest_client.get(url)
+                self.assertEqual(response['Vary'], 'Cookie, Accept-Encoding')
+                self.assertIn('public', response['Cache-Control'])
+                etag = response['ETag']
+                with self.assertNumQueries(queries):
+                    response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        index_url = reverse('posts:index')
+        response = self.authorized_client.get(index_url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(
+            response['ETag'], guest_client.get(index_url)['ETag']
+        )
+        etag = response['ETag']
+        Post.objects.create(text=TEXT_TWO, author=self.user)
+        response = self.authorized_client.get(
+            index_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_relogin_changes_etag(self):
+        """После повторного входа страница не отдаётся из кэша браузера.
+
+        Вход меняет CSRF-токен, и старая страница с формой комментария
+        получила бы отказ при отправке.
+        """
+        user = User.objects.create_user(username='relogin', password='pass')
+        client = Client()
+        credentials = {'username': 'relogin', 'password': 'pass'}
+        client.post(reverse('users:login'), credentials)
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = client.get(url)
+        etag = response['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        client.get(reverse('users:logout'))
+        client.post(reverse('users:login'), credentials)
+        self.assertEqual(response.wsgi_request.user, user)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
 
 class FollowTests(TestCase):
     def setUp(self):
@@ -303,3 +464,102 @@ class FollowTests(TestCase):
         self._subscribe(True, self.author)
         self._subscribe(True, self.author)
         self.assertEqual(self.user.follower.count(), 1)
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента подписок наполняется при подписке и чистится при отписке."""
+        self._subscribe(True, self.author)
+        new_post = Post.objects.create(author=self.author, text=TEXT_TWO)
+        self.assertEqual(
+            list(self.user.timeline.order_by('-pub_date').values_list(
+                'post_id', flat=True
+            )),
+            [new_post.pk, self.post.pk]
+        )
+        self._subscribe(False, self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_new_post_refreshes_cached_follow_feed(self):
+        """Новый пост виден в закэшированной ленте подписок.
+
+        Пост поднимает только версию профиля автора, а ленты подписчиков
+        зависят от неё сами.
+        """
+        self._subscribe(True, self.author)
+        self.client_auth_user.get(reverse('posts:follow_index'))
+        follow_version = fragments.get_version(f'feed:follow:{self.user.pk}')
+        new_post = Post.objects.create(author=self.author, text=TEXT_TWO)
+        self.assertEqual(
+            fragments.get_version(f'feed:follow:{self.user.pk}'),
+            follow_version
+        )
+        response = self.client_auth_user.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [new_post.pk, self.post.pk]
+        )
+
+
+class CommentPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username=USER_ONE)
+        self.post = Post.objects.create(author=self.user, text=TEXT_ONE)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Комментарий {i}')
+            for i in range(num_of_comments + 1)
+        )
+        self.client = Client()
+
+    def test_comments_paginated_by_cursor(self):
+        """Комментарии идут страницами, продолжение доступно и в JSON."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), num_of_comments)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            {'comments': comments.next_cursor}
+        )
+        data = response.json()
+        self.assertIn(f'Комментарий {num_of_comments}', data['html'])
+        self.assertEqual(data['html'].count('media-body'), 1)
+        self.assertIsNone(data['next'])
+
+    def test_cached_comments_not_read(self):
+        """Пока фрагмент комментариев в кэше, они не читаются из базы."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertContains(response, 'Комментарий 0')
+        self.assertContains(response, 'Ещё комментарии')
+        self.assertFalse(any(
+            'posts_comment' in query['sql'] for query in queries
+        ))
+
+    def test_renamed_commenter_shown_in_cached_comments(self):
+        """Новое имя комментатора попадает в закэшированные комментарии."""
+        commenter = User.objects.create_user(username=USER_TWO)
+        post = Post.objects.create(author=self.user, text=TEXT_ONE)
+        Comment.objects.create(
+            post=post, author=commenter, text='Комментарий гостя'
+        )
+        url = reverse('posts:post_detail', args=(post.pk,))
+        self.client.get(url)
+        commenter.username = 'renamed'
+        commenter.save()
+        response = self.client.get(url)
+        self.assertContains(
+            response, reverse('posts:profile', args=('renamed',))
+        )
+
+    def test_comments_fragment_only_for_get(self):
+        """Подгрузка комментариев отвечает только на GET."""
+        response = self.client.post(
+            reverse('posts:post_comments', args=(self.post.pk,))
+        )
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,94 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from . import counters, fragments, variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _source(name):
+    # Ключи миниатюр sorl зависят от хранилища исходника, поэтому имя
+    # оборачивается так же, как картинка поста в поле модели
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def generate(post_id, name):
+    """Генерирует варианты картинки поста.
+
+    Варианты записываются всем постам с этой картинкой, и их карточки
+    перерисовываются.
+    """
+    try:
+        post_ids = variants.record(name, variants.build(name))
+        fragments.rerender(post_ids)
+    except Exception:
+        logger.exception('Не удалось сгенерировать миниатюры %s', name)
+    else:
+        fragments.bump(*{f'post:{pk}' for pk in [post_id, *post_ids]})
+
+
+def _generate_in_worker(post_id, name):
+    try:
+        generate(post_id, name)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def _submit(post_id, name):
+    if settings.THUMBNAIL_WORKERS:
+        _get_executor().submit(_generate_in_worker, post_id, name)
+    else:
+        generate(post_id, name)
+
+
+def schedule(post):
+    """Ставит генерацию вариантов картинки поста в очередь после коммита.
+
+    Картинка, уже загруженная с другим постом, хранится под тем же
+    именем: её готовые варианты переносятся посту сразу.
+    """
+    if not post.image:
+        return
+    if variants.copy(post):
+        fragments.store_cards([post])
+        return
+    name = post.image.name
+    transaction.on_commit(lambda: _submit(post.pk, name))
+
+
+def delete_image(name):
+    """Удаляет файл картинки вместе с её миниатюрами и вариантами.
+
+    Если на файл успели снова сослаться, он остаётся.
+    """
+    try:
+        with transaction.atomic():
+            if not counters.forget_image(name):
+                return
+            variants.delete(name)
+            # Миниатюры sorl, оставшиеся с тех пор, как шаблоны брали
+            # картинки через {% thumbnail %}
+            delete(_source(name))
+    except Exception:
+        logger.exception('Не удалось удалить картинку %s', name)
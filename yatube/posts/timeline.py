@@ -0,0 +1,75 @@
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+
+
+def _entries(user_ids, posts):
+    return [
+        TimelineEntry(
+            user_id=user_id,
+            author_id=post.author_id,
+            post_id=post.pk,
+            pub_date=post.pub_date,
+        )
+        for user_id in user_ids
+        for post in posts
+    ]
+
+
+def reader_ids(*author_ids):
+    """Подписчики, в чьих лентах лежат посты авторов."""
+    return list(
+        Follow.objects.filter(author_id__in=author_ids)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+
+
+def fan_out_post(post):
+    """Кладёт новый пост в ленты всех подписчиков автора.
+
+    Возвращает id подписчиков, чьи ленты изменились.
+    """
+    follower_ids = reader_ids(post.author_id)
+    TimelineEntry.objects.bulk_create(
+        _entries(follower_ids, [post]),
+        ignore_conflicts=True,
+    )
+    return follower_ids
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту читателя все посты автора."""
+    posts = Post.objects.filter(author_id=author_id).only(
+        'pk', 'author_id', 'pub_date'
+    )
+    TimelineEntry.objects.bulk_create(
+        _entries([user_id], posts.iterator()),
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты читателя посты автора."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        author_id=author_id
+    ).delete()
+
+
+def rebuild():
+    """Пересобирает ленты всех читателей по текущим подпискам.
+
+    Записи собираются одним INSERT ... SELECT из подписок и постов,
+    без чтения строк в Python.
+    """
+    TimelineEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, author_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.author_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id'
+        )
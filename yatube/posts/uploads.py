@@ -0,0 +1,76 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 85
+
+
+class OversizedUploadedFile(UploadedFile):
+    """Заглушка вместо файла, превысившего MAX_UPLOAD_IMAGE_SIZE."""
+    oversized = True
+
+    def __init__(self, name, content_type, size):
+        super().__init__(BytesIO(), name, content_type, size)
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Перестаёт принимать файл, как только тот превысил лимит.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: куски сверх лимита дальше
+    не передаются и нигде не копятся, а форма получает заглушку.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_IMAGE_SIZE:
+            self.oversized = True
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.oversized:
+            return OversizedUploadedFile(
+                self.file_name, self.content_type, self.received
+            )
+        return None
+
+
+def ingest_image(uploaded):
+    """Уменьшает картинку и пересохраняет её без метаданных.
+
+    Режим draft позволяет декодеру JPEG сразу читать картинку
+    в уменьшенном масштабе, не разворачивая оригинал целиком.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    uploaded.seek(0)
+    image = Image.open(uploaded)
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side))
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha:
+        image, image_format = image.convert('RGBA'), 'PNG'
+    else:
+        image, image_format = image.convert('RGB'), 'JPEG'
+    content = BytesIO()
+    image.save(
+        content, image_format, quality=JPEG_QUALITY, optimize=True
+    )
+    extension = 'png' if has_alpha else 'jpg'
+    stem = os.path.splitext(os.path.basename(uploaded.name))[0]
+    return SimpleUploadedFile(
+        f'{stem}.{extension}',
+        content.getvalue(),
+        f'image/{image_format.lower()}'
+    )
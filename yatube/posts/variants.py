@@ -0,0 +1,137 @@
+# Варианты картинки поста для <picture>: кадр карточки 960x339 в нескольких
+# ширинах и форматах. Строятся фоновым воркером после сохранения поста,
+# а в шаблоне только подставляются готовые адреса. Имена вариантов
+# выводятся из имени исходника, поэтому у одинаковых картинок, которые
+# хранятся одним файлом, и варианты общие. Лежат они в своём каталоге
+# variants/, рядом с исходниками в posts/ их нет.
+import json
+import os
+import re
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Post
+
+WIDTHS = (320, 640, 960, 1440)
+ASPECT = (960, 339)
+VARIANTS_DIR = 'variants'
+# Современные форматы берутся, только если их умеет локальный Pillow;
+# JPEG остаётся запасным для старых браузеров
+FORMATS = (
+    ('AVIF', 'image/avif', 'avif', {'quality': 60}),
+    ('WEBP', 'image/webp', 'webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'image/jpeg', 'jpg',
+     {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def _storage():
+    return Post._meta.get_field('image').storage
+
+
+def available_formats():
+    Image.init()
+    return [
+        variant_format for variant_format in FORMATS
+        if variant_format[0] in Image.SAVE
+    ]
+
+
+def variant_name(name, width, extension):
+    stem = os.path.splitext(name)[0]
+    return os.path.join(VARIANTS_DIR, f'{stem}_{width}w.{extension}')
+
+
+def _widths(source_width):
+    widths = [width for width in WIDTHS if width <= source_width]
+    return widths or [source_width]
+
+
+def build(name):
+    """Пишет недостающие варианты картинки и отдаёт их описание.
+
+    Уже существующие файлы не перекодируются.
+    """
+    storage = _storage()
+    with storage.open(name) as source_file, Image.open(source_file) as source:
+        source.load()
+        width = min(source.width, round(source.height * ASPECT[0] / ASPECT[1]))
+        frame = ImageOps.fit(
+            source.convert('RGB'),
+            (width, round(width * ASPECT[1] / ASPECT[0])),
+            Image.LANCZOS,
+        )
+    sources = {}
+    for image_format, mime_type, extension, options in available_formats():
+        sources[mime_type] = []
+        for variant_width in _widths(frame.width):
+            variant = variant_name(name, variant_width, extension)
+            if not storage.exists(variant):
+                content = BytesIO()
+                frame.resize(
+                    (variant_width, max(1, round(
+                        variant_width * frame.height / frame.width
+                    ))),
+                    Image.LANCZOS,
+                ).save(content, image_format, **options)
+                storage.save_derived(variant, ContentFile(content.getvalue()))
+            sources[mime_type].append((variant, variant_width))
+    # В src и width/height идёт вариант под ширину колонки карточки
+    widths = _widths(frame.width)
+    default_width = max(
+        [width for width in widths if width <= ASPECT[0]] or widths[:1]
+    )
+    return {
+        'width': default_width,
+        'height': round(default_width * frame.height / frame.width),
+        'sources': sources,
+    }
+
+
+def record(name, variants):
+    """Записывает варианты всем постам с этой картинкой.
+
+    Возвращает id обновлённых постов.
+    """
+    posts = Post.objects.filter(image=name)
+    post_ids = list(posts.values_list('pk', flat=True))
+    posts.update(image_variants=json.dumps(variants))
+    return post_ids
+
+
+def copy(post):
+    """Переносит посту готовые варианты другого поста с той же картинкой."""
+    encoded = Post.objects.filter(image=post.image.name).exclude(
+        image_variants=''
+    ).values_list('image_variants', flat=True).first()
+    if encoded:
+        Post.objects.filter(pk=post.pk).update(image_variants=encoded)
+        post.image_variants = encoded
+    return bool(encoded)
+
+
+def load(post):
+    """Описание вариантов поста или None, если их ещё нет."""
+    if not post.image_variants:
+        return None
+    try:
+        return json.loads(post.image_variants)
+    except ValueError:
+        # Испорченное описание не должно ронять страницу: покажется
+        # исходная картинка, а generate перезапишет его
+        return None
+
+
+def delete(name):
+    """Удаляет все варианты картинки."""
+    storage = _storage()
+    directory = os.path.dirname(variant_name(name, 0, ''))
+    stem = os.path.splitext(os.path.basename(name))[0]
+    pattern = re.compile(re.escape(stem) + r'_\d+w\.\w+$')
+    if not storage.exists(directory):
+        return
+    for variant in storage.listdir(directory)[1]:
+        if pattern.match(variant):
+            storage.delete(os.path.join(directory, variant))
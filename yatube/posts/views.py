@@ -1,34 +1,69 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_GET
+
+from core.paginators import CursorPaginator
 
+from . import comment_queue, fragments, search, thumbnails
+from .comments import comments_cursor, comments_page, lazy_comments_page
+from .conditional import conditional_page, post_names, versioned
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Group, Post, SearchTerm, TimelineEntry, User
 
 num_of_pub: int = 10
 
 
-def general_paginator(request, paginator):
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+def general_paginator(request, paginator, feed=None, depends=()):
+    # Нумерованные страницы отдаём, только если их запросили явно
+    if 'page' in request.GET:
+        return paginator.get_page(request.GET.get('page'))
+    cursor = request.GET.get('cursor')
+    if feed is not None:
+        return fragments.cursor_page(paginator, cursor, feed, depends)
+    return paginator.get_cursor_page(cursor)
 
 
+@conditional_page(lambda request: ['feed:index'])
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, num_of_pub)
-    page_obj = general_paginator(request, paginator)
+    post_list = Post.objects.for_feed()
+    paginator = CursorPaginator(post_list, num_of_pub)
+    page_obj = general_paginator(request, paginator, 'feed:index')
+    page_obj.object_list = fragments.attach_cards(page_obj.object_list)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+def _group_names(request, slug):
+    group_pk = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+    if group_pk is None:
+        return None
+    return [
+        f'feed:group:{group_pk}',
+        f'group:{group_pk}',
+        *fragments.group_authors(group_pk),
+    ]
+
+
+@conditional_page(_group_names)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, num_of_pub)
-    page_obj = general_paginator(request, paginator)
+    posts = group.posts.for_feed()
+    paginator = CursorPaginator(posts, num_of_pub)
+    page_obj = general_paginator(
+        request, paginator, f'feed:group:{group.pk}'
+    )
+    page_obj.object_list = fragments.attach_cards(page_obj.object_list)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -36,10 +71,27 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+def _profile_names(request, username):
+    author_pk = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    if author_pk is None:
+        return None
+    return [
+        f'feed:profile:{author_pk}',
+        f'author:{author_pk}',
+        f'stats:{author_pk}',
+    ]
+
+
+@conditional_page(_profile_names)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, num_of_pub)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    post_list = author.posts.for_feed()
+    paginator = CursorPaginator(post_list, num_of_pub)
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user,
@@ -47,7 +99,10 @@ def profile(request, username):
         ).exists()
     else:
         following = None
-    page_obj = general_paginator(request, paginator)
+    page_obj = general_paginator(
+        request, paginator, f'feed:profile:{author.pk}'
+    )
+    page_obj.object_list = fragments.attach_cards(page_obj.object_list)
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -56,25 +111,52 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_names)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.order_by('created')
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
     form = CommentForm(request.POST or None)
+    # Комментарии читаются, только если их фрагмента нет в кэше
+    comments = lazy_comments_page(request, post.pk)
+    pending_comments = []
+    if settings.COMMENT_WRITE_BEHIND and request.user.is_authenticated:
+        # Свои комментарии из очереди видны автору сразу, в конце списка
+        pending_comments = comment_queue.pending(post.pk, request.user)
+        if pending_comments and comments.next_cursor:
+            pending_comments = []
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'comments_cursor': comments_cursor(request, post.pk),
+        'pending_comments': pending_comments,
+        'comments_version': fragments.get_version(f'comments:{post.pk}'),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@require_GET
+@versioned(lambda request, post_id: [f'comments:{post_id}'])
+def post_comments(request, post_id):
+    # Следующая порция комментариев для подгрузки без перезагрузки страницы
+    comments = comments_page(request, post_id)
+    return JsonResponse({
+        'html': render_to_string(
+            'includes/comment_list.html', {'comments': comments}
+        ),
+        'next': comments.next_cursor,
+    })
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None, )
     if form.is_valid():
-        create_post = form.save(commit=False)
-        create_post.author = request.user
-        create_post.save()
+        # Счётчики и ленты пишутся сигналами и коммитятся вместе с постом
+        with transaction.atomic():
+            create_post = form.save(commit=False)
+            create_post.author = request.user
+            create_post.save()
+            thumbnails.schedule(create_post)
         return redirect('posts:profile', create_post.author)
     context = {
         'form': form,
@@ -92,7 +174,10 @@ def post_edit(request, post_id):
         instance=edit_post
     )
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            edit_post = form.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(edit_post)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -106,33 +191,75 @@ def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+        if settings.COMMENT_WRITE_BEHIND:
+            comment_queue.enqueue(
+                post.pk, request.user.pk, form.cleaned_data['text']
+            )
+        else:
+            with transaction.atomic():
+                comment = form.save(commit=False)
+                comment.author = request.user
+                comment.post = post
+                comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, num_of_pub)
-    page_obj = general_paginator(request, paginator)
+    # Лента заранее разложена по читателям, поэтому читается
+    # одним диапазоном по индексу (user, pub_date)
+    entries = TimelineEntry.objects.filter(
+        user=request.user
+    ).select_related('post__author__stats', 'post__group')
+    paginator = CursorPaginator(
+        entries, num_of_pub, ordering=('-pub_date', '-post_id')
+    )
+    page_obj = general_paginator(
+        request,
+        paginator,
+        f'feed:follow:{request.user.pk}',
+        fragments.followed_feeds(request.user.pk)
+    )
+    page_obj.object_list = fragments.attach_cards(
+        [entry.post for entry in page_obj]
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/follow.html', context)
 
 
+def search_results(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search.search(query), num_of_pub)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    hits = search.load_objects(page_obj.object_list)
+    posts = fragments.attach_cards(
+        [hit['object'] for hit in hits if hit['kind'] == SearchTerm.POST]
+    )
+    cards = {post.pk: post for post in posts}
+    for hit in hits:
+        if hit['kind'] == SearchTerm.POST:
+            hit['object'] = cards[hit['object_id']]
+    page_obj.object_list = hits
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def profile_follow(request, username):
     # Подписаться на автора
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=author,
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=request.user,
+                author=author,
+            )
     return redirect(
         'posts:profile',
         author.username
@@ -143,10 +270,11 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     # Отписаться
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(
-        user=request.user,
-        author=author,
-    ).delete()
+    with transaction.atomic():
+        Follow.objects.filter(
+            user=request.user,
+            author=author,
+        ).delete()
     return redirect(
         'posts:profile',
         author.username